@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word Game! engine benchmarks\n
+Times the engine hot paths against a dictionary file and synthetic dictionaries,
+saves the results as JSON and compares them against a stored baseline\n
+Usage: python bench.py [--sizes 100000 1000000] [--output FILE] [--baseline FILE]
+"""
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from random import Random
+from time import perf_counter
+import engine
+
+DICTIONARY_FILENAME = 'tagalog.txt'
+SIZES = (100000, 1000000, 10000000) # synthetic dictionary sizes
+CALLS = 200 # most timed samples per function
+SECONDS = 2.0 # most seconds spent timing one function
+SAMPLE_SECONDS = 0.001 # least time of a timed sample, fast functions are called in batches
+MEMORY_CALLS = 5 # calls traced with tracemalloc to find peak memory
+THRESHOLD = 0.2 # allowed relative regression against the baseline
+# metric: True if higher is better
+TRACKED = {'throughput': True, 'p50_ms': False, 'p99_ms': False, 'peak_kib': False}
+# metric: least absolute change that may be a regression, below it timer and scheduler
+# noise dominates, throughput is compared as milliseconds per call
+FLOORS = {'throughput': 0.002, 'p50_ms': 0.002, 'p99_ms': 0.01, 'peak_kib': 64}
+# letters weighted roughly like tagalog.txt so that synthetic words have anagrams
+LETTERS = 'aaaaaaaannnnniiiiggggppptttlllkkksssuuummmoobbyyrrhhde'
+
+def synthetic_words(count, seed=0):
+    """Returns count distinct random lowercase words of 3 to 10 letters"""
+    rng = Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choices(LETTERS, k=rng.randint(3, 10))))
+    return sorted(words)
+
+def percentile(sorted_values, fraction):
+    """Returns the value at fraction (0 to 1) of an already sorted list"""
+    return sorted_values[min(len(sorted_values)-1, int(fraction*len(sorted_values)))]
+
+def measure(function, arguments, calls=CALLS, seconds=SECONDS):
+    """Calls function once per item of arguments (cycling) until calls samples or seconds
+    run out, at least once\n
+    A sample times one call, or a batch of calls for functions faster than
+    SAMPLE_SECONDS: the batch doubles until a sample takes that long, the shorter ones
+    before are not kept. Latencies are the mean call time of each sample.
+    Returns a dict of calls made, throughput (calls per second), p50_ms, p99_ms and
+    peak_kib, the peak memory allocated by a few extra traced calls
+    """
+    latencies = [] # mean seconds per call of each kept sample
+    made, batch = 0, 1 # calls made, calls per sample
+    started = perf_counter()
+    while not latencies or (len(latencies) < calls and perf_counter() - started < seconds):
+        start = perf_counter()
+        for _ in range(batch):
+            function(*arguments[made % len(arguments)])
+            made += 1
+        elapsed = perf_counter() - start
+        if elapsed < SAMPLE_SECONDS and not latencies:
+            batch *= 2 # too short to time reliably, time more calls at once
+            continue
+        latencies.append(elapsed/batch)
+    latencies.sort()
+    tracemalloc.start()
+    for argument in arguments[:MEMORY_CALLS]:
+        function(*argument)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'calls': made,
+            'throughput': len(latencies)/sum(latencies) if sum(latencies) else 0.0,
+            'p50_ms': percentile(latencies, 0.50)*1000,
+            'p99_ms': percentile(latencies, 0.99)*1000,
+            'peak_kib': peak/1024}
+
+def bench_lexicon(words, calls=CALLS, seconds=SECONDS, seed=0):
+    """Builds a lexicon of words and times every engine hot path against it\n
+    Returns a dict of function name: measure result
+    """
+    rng = Random(seed)
+    results = {}
+    lexicons = []
+    def load():
+        lexicons.clear() # the timed lexicon is freed before the traced call builds another
+        lexicons.append(engine.Lexicon(words))
+    results['load'] = measure(load, [()], 1, 0)
+    lexicon = lexicons[0]
+    del lexicons
+    engine.set_dictionary(lexicon)
+    sample = rng.sample(lexicon.words, min(len(lexicon.words), 1000))
+    racks = [(engine.combine_words(rng.choices(lexicon.words, k=2)), lexicon) for _ in range(50)]
+    # time the searches without the query cache, cached_words times the cache
+    searches = [(chars, lexicon, None, False) for chars, _ in racks]
+    engine.possible_words(*searches[0]) # build the backend's index outside of the timing
+    results['possible_words'] = measure(engine.possible_words, searches, calls, seconds)
+    engine.best_words(racks[0][0], 5, lexicon, cache=False) # build the score order outside
+    results['best_words'] = measure(engine.best_words, [(chars, 5, lexicon, None, False) for \
+                                    chars, _ in racks], calls, seconds)
+    engine.possible_words_batch([chars for chars, _ in racks], lexicon) # fill the cache
+    results['cached_words'] = measure(engine.possible_words, racks, calls, seconds)
+    results['find_anagrams'] = measure(engine.find_anagrams,
+                                       [(word, lexicon) for word in sample], calls, seconds)
+    try:
+        engine.get_anagram_set(2, lexicon=lexicon)
+    except ValueError: # the dictionary has no anagram classes big enough
+        pass
+    else:
+        results['get_anagram_set'] = measure(engine.get_anagram_set, [(2, None, lexicon)],
+                                             calls, seconds)
+    results['makeable'] = measure(engine.makeable, [(chars, word, lexicon) for \
+                                  (chars, _), word in zip(racks*20, sample)], calls, seconds)
+    results['combine_words'] = measure(engine.combine_words,
+                                       [(sample[i:i+2],) for i in range(0, len(sample)-1, 2)],
+                                       calls, seconds)
+    results['get_score'] = measure(engine.get_score, [(word, lexicon) for word in sample],
+                                   calls, seconds)
+    return results
+
+def compare(results, baseline, threshold=THRESHOLD, tracked=None, floors=None):
+    """Returns a list of regression messages of results against baseline\n
+    A tracked metric (of TRACKED unless tracked is given) regresses when it is worse than
+    the baseline by more than threshold (a fraction of the baseline value), and by more
+    than its floor (of FLOORS unless floors is given) if it has one
+    """
+    floors = FLOORS if floors is None else floors
+    regressions = []
+    for dictionary, functions in results['dictionaries'].items():
+        for function, metrics in functions.items():
+            old_metrics = baseline.get('dictionaries', {}).get(dictionary, {}).get(function)
+            if not old_metrics:
+                continue
+            for metric, higher_is_better in (tracked or TRACKED).items():
+                old, new = old_metrics.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old)/old
+                if metric == 'throughput': # per call times
+                    difference = 1000/new - 1000/old if new else float('inf')
+                else:
+                    difference = old - new if higher_is_better else new - old
+                if (-change if higher_is_better else change) > threshold and \
+                   difference > floors.get(metric, 0):
+                    regressions.append('{} {} {}: {:.4g} -> {:.4g} ({:+.0%})'.format(
+                        dictionary, function, metric, old, new, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Word Game! engine')
+    parser.add_argument('--dictionary', default=DICTIONARY_FILENAME,
+                        help='dictionary file to benchmark (empty to skip)')
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(SIZES),
+                        help='synthetic dictionary sizes')
+    parser.add_argument('--calls', type=int, default=CALLS)
+    parser.add_argument('--seconds', type=float, default=SECONDS)
+    parser.add_argument('--backend', choices=engine.BACKENDS, help='possible_words backend')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed regression as a fraction, default %(default)s')
+    args = parser.parse_args(argv)
+    if args.backend:
+        engine.set_backend(args.backend)
+
+    dictionaries = []
+    if args.dictionary:
+        dictionaries.append((args.dictionary, lambda: engine.open_dictionary(args.dictionary)))
+    for size in args.sizes:
+        dictionaries.append(('synthetic-{}'.format(size),
+                             lambda size=size: synthetic_words(size, args.seed)))
+    results = {'python': platform.python_version(), 'backend': engine.BACKEND,
+               'numpy': engine.numpy.__version__ if engine.numpy is not None else None,
+               'dictionaries': {}}
+    for name, get_words in dictionaries:
+        functions = bench_lexicon(get_words(), args.calls, args.seconds, args.seed)
+        results['dictionaries'][name] = functions
+        for function, metrics in functions.items():
+            print('{:<20} {:<16} {:>12.1f}/s  p50 {:>9.3f} ms  p99 {:>9.3f} ms  peak {:>10.0f} KiB'
+                  .format(name, function, metrics['throughput'], metrics['p50_ms'],
+                          metrics['p99_ms'], metrics['peak_kib']))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,7 +4,37 @@
 Word Game! game logic\n
 Contains game logic and the dictionary variable that the functions are dependent to
 """
-from random import choice as random_choice
+import os
+import sys
+import gc
+import mmap
+import struct
+import json
+import threading
+import unicodedata
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple, OrderedDict
+from collections.abc import ItemsView, Mapping, Sequence, Set
+from heapq import nlargest
+from itertools import accumulate, chain, compress, count, filterfalse
+from hashlib import sha256
+from multiprocessing import parent_process, resource_tracker, shared_memory
+from queue import Queue
+from random import randrange as random_randrange, choices as random_choices, Random
+try:
+    import numpy
+except ImportError: # numpy is optional, only the 'numpy' backend needs it
+    numpy = None
+try:
+    import fcntl
+except ImportError: # not available on Windows, save files are then written unlocked
+    fcntl = None
 
 SCRABBLE = {'e':1, 'a':1, 'i':1, 'o':1, 'n':1, 'r':1, 't':1, 'l':1, 's':1, 'u':1,
             'd':2, 'g':2,
@@ -13,32 +43,1496 @@ SCRABBLE = {'e':1, 'a':1, 'i':1, 'o':1, 'n':1, 'r':1, 't':1, 'l':1, 's':1, 'u':1
             'k':5,
             'j':8, 'x':8,
             'q':10, 'z':10}
+BACKENDS = ('python', 'numpy', 'trie') # ways possible_words may search a lexicon
+BACKEND = 'numpy' if numpy is not None else 'python' # default backend
+BATCH_CELLS = 1 << 24 # max racks*words*letters compared at once by the numpy backend
+RACK_SAMPLE = 1000 # racks measured by a RackIndex, and by each time it grows
+RACK_LIMIT = 8000 # racks a RackIndex may grow to while looking for a difficulty band
+QUERY_CACHE_SIZE = 1024 # query results kept by the QueryCache of each lexicon
+OVERLAY_LIMIT = 1024 # changed words an updated lexicon keeps beside its base before merging
+BEST_CHUNK = 1024 # score ordered words first compared by the numpy backend of best_words
+WATCH_INTERVAL = 1.0 # seconds between checks of a watched dictionary file
+TOP_SCORES = 10 # high scores kept per mode
+LIVES = 3 # lives of a game session
+AT_LEAST = 3 # minimum letters of a Construct Words answer
+HIGHSCORE_HEADER = '#word-game highscores 2' # first line of the multi-entry save format
+# environment variables: instrument the engine on import if set to a non-empty value,
+# and where dump_instrumentation writes (.prom for Prometheus text, else JSON, unset: stderr)
+INSTRUMENT_ENV = 'WORDGAME_INSTRUMENT'
+INSTRUMENT_FILE_ENV = 'WORDGAME_INSTRUMENT_FILE'
+# upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+CACHE_SUFFIX = '.wgc' # compiled dictionary sidecar: <dictionary filename><CACHE_SUFFIX>
+CACHE_MAGIC = b'WGDC'
+CACHE_VERSION = 3
+# sections of a compiled lexicon in order, each starting at a multiple of 8 bytes:
+# text (alphabet, words and distinct signatures joined by newlines, language name),
+# letter count matrix (uint8) and scores, then the lookup tables read in place (uint32
+# unless noted): word and signature start offsets (uint64), the word hash table, the
+# start of each anagram class in members, word indexes by class, anagram pool and counts
+CACHE_SECTIONS = ('alphabet', 'words', 'signatures', 'language', 'matrix', 'scores',
+                  'word_offsets', 'signature_offsets', 'word_table', 'classes', 'members',
+                  'pool', 'pool_counts')
+# magic, version, source mtime_ns, source size, source sha256, word count,
+# byte length of each of CACHE_SECTIONS
+CACHE_HEADER = struct.Struct('<4sIqQ32sQ' + 'Q'*len(CACHE_SECTIONS))
+PUNCTUATION_POLICIES = ('keep', 'strip', 'skip') # what Language.normalize does to punctuation
+
+class Language:
+    """Alphabet, letter scores and word normalization of a dictionary's language\n
+    scores is a dict of lowercase letter: score, compiled into score_table, an array of
+    the score of every character code (uppercase letters included) up to the highest one.
+    Characters outside the alphabet, like punctuation, score 0\n
+    Words are normalized as they are loaded: Unicode normalization to form if given
+    (such as 'NFC'), lowercased if fold_case, then the punctuation characters are
+    kept, stripped, or the words holding them skipped, see PUNCTUATION_POLICIES
+    """
+    def __init__(self, name, scores, fold_case=True, punctuation='keep',
+                 punctuation_chars="-'", form=None):
+        if punctuation not in PUNCTUATION_POLICIES:
+            raise ValueError('Unknown punctuation policy {!r}, expected one of {}'.format(
+                punctuation, PUNCTUATION_POLICIES))
+        self.name = name
+        self.scores = dict(scores)
+        self.alphabet = ''.join(sorted(self.scores))
+        self.fold_case = fold_case
+        self.punctuation = punctuation
+        self.punctuation_chars = punctuation_chars
+        self.form = form
+        letters = {}
+        for letter, score in self.scores.items():
+            letters[letter] = score
+            if len(letter.upper()) == 1:
+                letters.setdefault(letter.upper(), score)
+        self.score_table = array('I', bytes(4 * (max(map(ord, letters), default=-1) + 1)))
+        for letter, score in letters.items():
+            self.score_table[ord(letter)] = score
+        # the same table as 256 bytes when it fits, so latin-1 words are scored in C
+        self._byte_table = None
+        if len(self.score_table) <= 256 and max(self.score_table, default=0) <= 255:
+            self._byte_table = bytes(self.score_table.tolist()) + \
+                               bytes(256 - len(self.score_table))
+        self._strip_table = dict.fromkeys(map(ord, punctuation_chars))
+
+    def normalize(self, word):
+        """Returns word normalized for this language, None if it is to be skipped"""
+        if self.form is not None:
+            word = unicodedata.normalize(self.form, word)
+        if self.fold_case:
+            word = word.lower()
+        if self.punctuation == 'strip':
+            word = word.translate(self._strip_table)
+        elif self.punctuation == 'skip' and any(char in word for \
+                                                char in self.punctuation_chars):
+            return None
+        return word or None
+
+    def score(self, word):
+        """Returns the score of word, the sum of its characters' scores"""
+        if self._byte_table is not None:
+            try:
+                return sum(word.encode('latin-1').translate(self._byte_table))
+            except UnicodeEncodeError: # a character past latin-1, which scores 0
+                pass
+        table = self.score_table
+        return sum(table[code] for code in map(ord, word) if code < len(table))
+
+LANGUAGES = {} # name: Language, see register_language
+
+def register_language(language):
+    """Makes a Language available by name to get_language, returns it"""
+    LANGUAGES[language.name] = language
+    return language
+
+def get_language(name):
+    """Returns the registered Language called name, raises ValueError if there is none"""
+    try:
+        return LANGUAGES[name]
+    except KeyError:
+        raise ValueError('Unknown language {!r}, expected one of {}'.format(
+            name, tuple(LANGUAGES))) from None
+
+ENGLISH = register_language(Language('english', SCRABBLE))
+LANGUAGE = ENGLISH # default language of new lexicons
+
+def set_language(language):
+    """Sets the default LANGUAGE of new lexicons, a Language or a registered name"""
+    global LANGUAGE
+    LANGUAGE = language if isinstance(language, Language) else get_language(language)
+
+def get_signature(word):
+    """word -> get_signature(word) -> canonical anagram signature\n
+    Words are anagrams of each other if and only if their signatures are equal
+    Note: letters are all treated as lowercase and returns in lowercase
+    """
+    return ''.join(sorted(word.lower()))
+
+def build_anagram_pool(index):
+    """Accepts an anagram index and returns (pool, counts)\n
+    pool is a tuple of every word with at least one anagram, ordered by anagram class
+    size descending, and counts[n] is the number of leading pool words that have
+    at least n anagrams, so pool[:counts[n]] are exactly the valid base words
+    """
+    classes = sorted((words for words in index.values() if len(words) > 1),
+                     key=len, reverse=True)
+    pool = tuple(word for words in classes for word in words)
+    counts = [len(pool)] # every pool word has at least 0 anagrams
+    total = len(pool)
+    for words in reversed(classes):
+        # every class smaller than the current one is cut off from counts[len(words)-1]
+        while len(counts) < len(words):
+            counts.append(total)
+        total -= len(words)
+    return pool, counts
+
+def update_anagram_pool(pool, counts, changes):
+    """Accepts a pool and counts made by build_anagram_pool and the anagram classes that
+    changed as (old words, new words) pairs, returns (pool, counts) of the changed index\n
+    Only the parts of the pool holding classes of the changed sizes are made again.
+    Unchanged classes keep their place and changed ones go at the end of their size's part
+    """
+    # classes of size s are pool[counts[s]:counts[s-1]], the largest size is len(counts)
+    leaving, joining = {}, {} # size: words leaving or joining the part of that size
+    for old_words, new_words in changes:
+        if len(old_words) > 1:
+            leaving.setdefault(len(old_words), set()).update(old_words)
+        if len(new_words) > 1:
+            joining.setdefault(len(new_words), []).extend(new_words)
+    parts = [] # (size, words), largest size first
+    for size in range(max([len(counts)] + list(joining)), 1, -1):
+        if size <= len(counts):
+            part = pool[counts[size] if size < len(counts) else 0:counts[size-1]]
+        else:
+            part = ()
+        if size in leaving:
+            part = tuple(filterfalse(leaving[size].__contains__, part))
+        if size in joining:
+            part = tuple(part) + tuple(joining[size])
+        if part or parts:
+            parts.append((size, part))
+    pool = tuple(chain.from_iterable(part for _, part in parts))
+    counts = [len(pool)]*(parts[0][0] if parts else 1)
+    total = 0
+    for size, part in parts:
+        total += len(part)
+        counts[size-1] = total
+    return pool, counts
+
+def build_letter_matrix(words):
+    """Accepts words and returns (alphabet, matrix) as described in Lexicon.letter_matrix"""
+    words = [word.lower() for word in words]
+    lengths = numpy.fromiter((len(word) for word in words), numpy.int64, len(words))
+    codes = numpy.frombuffer(''.join(words).encode('utf-32-le'), numpy.uint32)
+    letters, columns = numpy.unique(codes, return_inverse=True)
+    alphabet = {chr(letter): column for column, letter in enumerate(letters.tolist())}
+    rows = numpy.repeat(numpy.arange(len(words)), lengths)
+    matrix = numpy.zeros((len(words), len(alphabet)), numpy.uint16)
+    numpy.add.at(matrix, (rows, columns.reshape(-1)), 1)
+    return alphabet, numpy.minimum(matrix, 255).astype(numpy.uint8)
+
+class _GraphNode:
+    """Not used by itself, node of WordGraph"""
+    __slots__ = ('children', 'terminal')
+
+    def __init__(self):
+        self.children = {} # letter: _GraphNode
+        self.terminal = False # True if the path to this node spells a word
+
+    def copy(self):
+        """Returns a node with the same terminal flag and its own copy of the children"""
+        node = _GraphNode()
+        node.children, node.terminal = dict(self.children), self.terminal
+        return node
+
+class WordGraph:
+    """Trie of lowercased words that may be minimized into a DAWG\n
+    (directed acyclic word graph) where equal suffix subtrees are shared
+    """
+    def __init__(self, words=()):
+        self.root = _GraphNode()
+        self.minimized = False
+        self.shared = False # True if nodes are shared with the graph this was updated from
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        """Adds a word to the graph, only possible before it is minimized or updated"""
+        if self.minimized or self.shared:
+            raise ValueError('Cannot add words to a minimized or updated WordGraph')
+        node = self.root
+        for letter in word.lower():
+            child = node.children.get(letter)
+            if child is None:
+                child = node.children[letter] = _GraphNode()
+            node = child
+        node.terminal = True
+
+    def __contains__(self, word):
+        node = self.root
+        for letter in word.lower():
+            node = node.children.get(letter)
+            if node is None:
+                return False
+        return node.terminal
+
+    def minimize(self):
+        """Merges equal subtrees so that every distinct suffix set is stored once"""
+        register = {} # (terminal, ((letter, id(child)),...)): node
+        def merge(node):
+            for letter, child in node.children.items():
+                node.children[letter] = merge(child)
+            key = (node.terminal, tuple(sorted((letter, id(child)) for \
+                                               letter, child in node.children.items())))
+            return register.setdefault(key, node)
+        self.root = merge(self.root)
+        self.minimized = True
+
+    def updated(self, added=(), removed=()):
+        """Returns a new WordGraph with the words of added and without those of removed,
+        this graph is left unchanged\n
+        Only the nodes on the path of each changed word are copied, every other node is
+        shared with this graph, so it works on a minimized graph as well
+        """
+        graph = WordGraph()
+        graph.minimized, graph.shared = self.minimized, True
+        graph.root = self.root.copy()
+        copies = {'': graph.root} # prefix: copied node, shared nodes are copied per path
+        def copy_path(word):
+            nodes = [graph.root]
+            for end in range(1, len(word) + 1):
+                node = copies.get(word[:end])
+                if node is None:
+                    original = nodes[-1].children.get(word[end-1])
+                    node = copies[word[:end]] = _GraphNode() if original is None else \
+                                                original.copy()
+                    nodes[-1].children[word[end-1]] = node
+                nodes.append(node)
+            return nodes
+        for word in removed:
+            word = word.lower()
+            if word not in self:
+                continue
+            nodes = copy_path(word)
+            nodes[-1].terminal = False
+            # drop the nodes that no longer lead to any word
+            for end in range(len(word), 0, -1):
+                if nodes[end].terminal or nodes[end].children:
+                    break
+                del nodes[end-1].children[word[end-1]]
+                del copies[word[:end]]
+        for word in added:
+            copy_path(word.lower())[-1].terminal = True
+        return graph
+
+    def size(self):
+        """Returns (node count, edge count) of the graph"""
+        seen = {id(self.root)}
+        stack = [self.root]
+        edges = 0
+        while stack:
+            node = stack.pop()
+            edges += len(node.children)
+            for child in node.children.values():
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+        return len(seen), edges
+
+    def sub_words(self, letter_counts):
+        """Accepts a dict as returned by count_letters and returns every word in the graph
+        that can be made from those letters in a list, in lowercase\n
+        Walks the graph depth first consuming letters, so a subtree is never entered
+        once the letter leading to it has run out
+        """
+        counts = dict(letter_counts)
+        words = []
+        path = []
+        def walk(node):
+            if node.terminal:
+                words.append(''.join(path))
+            for letter, count in counts.items():
+                if count:
+                    child = node.children.get(letter)
+                    if child is not None:
+                        counts[letter] = count - 1
+                        path.append(letter)
+                        walk(child)
+                        path.pop()
+                        counts[letter] = count
+        walk(self.root)
+        return words
+
+class PrefixCursor:
+    """Letters typed so far and where they lead in a WordGraph\n
+    push and pop take constant time whatever the size of the graph, so the prefix
+    can be checked on every keystroke. Letters are treated as lowercase
+    """
+    __slots__ = ('graph', '_nodes')
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._nodes = [graph.root] # node reached by each prefix, None once off the graph
+
+    def __len__(self):
+        return len(self._nodes) - 1
+
+    @property
+    def viable(self):
+        """True if some word in the graph starts with the prefix"""
+        return self._nodes[-1] is not None
+
+    @property
+    def complete(self):
+        """True if the prefix is itself a word in the graph"""
+        node = self._nodes[-1]
+        return node is not None and node.terminal
+
+    def push(self, letter):
+        """Adds a letter to the prefix, returns (viable, complete)"""
+        node = self._nodes[-1]
+        self._nodes.append(None if node is None else node.children.get(letter.lower()))
+        return self.viable, self.complete
+
+    def pop(self):
+        """Removes the last letter of the prefix, returns (viable, complete)\n
+        Raises IndexError if the prefix is empty
+        """
+        if len(self._nodes) == 1:
+            raise IndexError('pop from an empty prefix')
+        self._nodes.pop()
+        return self.viable, self.complete
+
+    def reset(self):
+        """Empties the prefix"""
+        del self._nodes[1:]
+
+class QueryCache:
+    """Results of the latest lexicon queries, keyed by the query's anagram signature\n
+    Holds at most maxsize results (0 disables it), the least recently used is evicted
+    first. Safe to use from several threads. Counts are kept in stats
+    """
+    def __init__(self, maxsize=QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._entries = OrderedDict() # key: result, least recent first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the result stored for key, None if there is none"""
+        if not self.maxsize:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.stats['misses'] += 1
+            else:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+            return result
+
+    def put(self, key, result):
+        """Stores the result of key, evicting the least recently used ones over maxsize"""
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Forgets every stored result, keeps the counts"""
+        with self._lock:
+            self._entries.clear()
+
+def _word_hash(data):
+    """Not used by itself, hash of an encoded word in a compiled word table, the same
+    in every process unlike hash()
+    """
+    return zlib.crc32(data)
+
+class _BlockWords(Sequence):
+    """Not used by itself, words of a compiled lexicon, decoded from the block on access"""
+    __slots__ = ('_data', '_offsets')
+
+    def __init__(self, data, offsets):
+        self._data = data # words joined by newlines
+        self._offsets = offsets # start of each word, then the end of the data + 1
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[index] for index in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('word index out of range')
+        return str(self._data[self._offsets[index]:self._offsets[index+1]-1],
+                   'utf-8', 'surrogateescape')
+
+    def __iter__(self):
+        return iter(str(self._data, 'utf-8', 'surrogateescape').split('\n') if self else ())
+
+    def encoded(self, index):
+        """Returns the encoded word at index, a view of the block"""
+        return self._data[self._offsets[index]:self._offsets[index+1]-1]
+
+class _BlockWordSet(Set):
+    """Not used by itself, membership of the words of a compiled lexicon, looked up in
+    the block's open addressing hash table of word index + 1 (0 for an empty slot)
+    """
+    __slots__ = ('_words', '_table', '_mask')
+
+    def __init__(self, words, table):
+        self._words = words
+        self._table = table # length is a power of two
+        self._mask = len(table) - 1
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+    def find(self, word):
+        """Returns the index of word in the lexicon's words, -1 if it is not one of them"""
+        try:
+            data = word.encode('utf-8', 'surrogateescape')
+        except (AttributeError, UnicodeEncodeError): # not a word that can be stored
+            return -1
+        table, mask, encoded = self._table, self._mask, self._words.encoded
+        slot = _word_hash(data) & mask
+        index = table[slot]
+        while index:
+            if encoded(index - 1) == data:
+                return index - 1
+            slot = (slot + 1) & mask
+            index = table[slot]
+        return -1
+
+    def __contains__(self, word):
+        return self.find(word) >= 0
+
+    def __len__(self):
+        return len(self._words)
+
+    def __iter__(self):
+        return iter(self._words)
+
+class _BlockAnagramItems(ItemsView):
+    """Not used by itself, items of a _BlockAnagramIndex read in one pass"""
+    def __iter__(self):
+        index = self._mapping
+        words, classes, members = index._words, index._classes, index._members
+        for group, signature in enumerate(index):
+            yield signature, [words[member] for member in \
+                              members[classes[group]:classes[group+1]]]
+
+class _BlockAnagramIndex(Mapping):
+    """Not used by itself, anagram index of a compiled lexicon: signatures are sorted in
+    the block and found by bisection, their classes are ranges of word indexes
+    """
+    __slots__ = ('_words', '_signatures', '_classes', '_members')
+
+    def __init__(self, words, signatures, classes, members):
+        self._words = words
+        self._signatures = signatures # _BlockWords of the sorted distinct signatures
+        self._classes = classes # start of each class in members, then len(members)
+        self._members = members
+
+    def _find(self, signature):
+        """Returns the position of signature among the sorted signatures, -1 if absent"""
+        try:
+            data = signature.encode('utf-8', 'surrogateescape')
+        except (AttributeError, UnicodeEncodeError):
+            return -1
+        encoded = self._signatures.encoded
+        low, high = 0, len(self._signatures)
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(encoded(middle)) < data:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(self._signatures) and encoded(low) == data else -1
+
+    def __getitem__(self, signature):
+        group = self._find(signature)
+        if group < 0:
+            raise KeyError(signature)
+        return [self._words[member] for member in \
+                self._members[self._classes[group]:self._classes[group+1]]]
+
+    def __contains__(self, signature):
+        return self._find(signature) >= 0
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __iter__(self):
+        return iter(self._signatures)
+
+    def items(self):
+        return _BlockAnagramItems(self)
+
+class _BlockPool(Sequence):
+    """Not used by itself, anagram pool of a compiled lexicon as word indexes"""
+    __slots__ = ('_words', '_indexes')
+
+    def __init__(self, words, indexes):
+        self._words = words
+        self._indexes = indexes
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(map(self._words.__getitem__, self._indexes[index]))
+        return self._words[self._indexes[index]]
+
+class _Overlay:
+    """Not used by itself, the words an updated lexicon changed from its base lexicon\n
+    Positions of words below kept hold base words: the base word of the same index,
+    unless moved maps the position to the base index of the word moved there to fill a
+    removed word's place (places is the other way round). Positions from kept on hold
+    the added words. removed are the base words that were removed and changed maps the
+    signature of every changed anagram class to its words. An overlay is not changed
+    once its lexicon is made, updating it again works on a copy
+    """
+    __slots__ = ('base', 'kept', 'moved', 'places', 'added', 'added_set', 'removed',
+                 'changed')
+
+    def __init__(self, base):
+        self.base = base
+        self.kept = len(base.words)
+        self.moved = {} # position: base index of the word moved there
+        self.places = {} # base index: position, of the moved words
+        self.added = []
+        self.added_set = set()
+        self.removed = set()
+        self.changed = {} # signature: tuple of words
+
+    def copy(self):
+        """Returns an overlay of the same changes that may be changed further"""
+        overlay = _Overlay.__new__(_Overlay)
+        overlay.base, overlay.kept = self.base, self.kept
+        overlay.moved, overlay.places = dict(self.moved), dict(self.places)
+        overlay.added, overlay.added_set = list(self.added), set(self.added_set)
+        overlay.removed, overlay.changed = set(self.removed), dict(self.changed)
+        return overlay
+
+    def __len__(self):
+        return len(self.moved) + len(self.added) + len(self.removed)
+
+    def positions(self):
+        """Returns the positions of the words that are not at their base index"""
+        return list(self.moved) + list(range(self.kept, self.kept + len(self.added)))
+
+    def _anagram_class(self, signature):
+        """Not used by itself, returns a new list of the current words of a class"""
+        if signature in self.changed:
+            return list(self.changed[signature])
+        return list(self.base.anagram_index.get(signature, ()))
+
+    def add(self, word, signature):
+        """Adds a word that is not in the lexicon"""
+        anagram_class = self._anagram_class(signature)
+        anagram_class.append(word)
+        self.changed[signature] = tuple(anagram_class)
+        self.added.append(word)
+        self.added_set.add(word)
+
+    def remove(self, word, signature):
+        """Removes a word of the lexicon, the last base word takes its place"""
+        anagram_class = self._anagram_class(signature)
+        anagram_class.remove(word)
+        self.changed[signature] = tuple(anagram_class)
+        if word in self.added_set:
+            self.added_set.discard(word)
+            self.added.remove(word)
+            return
+        self.removed.add(word)
+        index = self.base._index(word)
+        position = self.places.pop(index, index)
+        last = self.kept - 1
+        source = self.moved.pop(last, last)
+        if position != last:
+            self.moved[position] = source
+            self.places[source] = position
+        self.kept = last
+
+    def pool_counts(self):
+        """Returns the anagram pool counts of the changed lexicon, as build_anagram_pool"""
+        counts = self.base.anagram_pool_counts
+        sizes = {} # class size: number of pool words in classes of that size
+        for size in range(2, len(counts) + 1):
+            sizes[size] = counts[size-1] - (counts[size] if size < len(counts) else 0)
+        for signature, words in self.changed.items():
+            old_size = len(self.base.anagram_index.get(signature, ()))
+            if old_size > 1:
+                sizes[old_size] -= old_size
+            if len(words) > 1:
+                sizes[len(words)] = sizes.get(len(words), 0) + len(words)
+        largest = max((size for size, total in sizes.items() if total), default=1)
+        counts, total = [0]*largest, 0
+        for size in range(largest, 1, -1):
+            total += sizes.get(size, 0)
+            counts[size-1] = total
+        counts[0] = total
+        return counts
+
+    def word_graph(self):
+        """Returns the base word graph updated with the changed words"""
+        base = self.base
+        graph = base.word_graph()
+        added = {word.lower() for word in self.added}
+        removed = {word.lower() for word in self.removed} - added
+        if not base.language.fold_case: # a word spelled like a kept one keeps its path
+            removed = {lowered for lowered in removed if all(
+                base.words[index] in self.removed for index in base._lowered_index[lowered])}
+        return graph.updated(added, removed)
+
+class _OverlaySequence(Sequence):
+    """Not used by itself, words (or scores) of an updated lexicon: those of its base
+    read through an _Overlay, then the added ones
+    """
+    __slots__ = ('_base', '_overlay', '_added')
+
+    def __init__(self, base, overlay, added):
+        self._base = base
+        self._overlay = overlay
+        self._added = added # one value per added word
+
+    def __len__(self):
+        return self._overlay.kept + len(self._added)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[index] for index in range(*index.indices(len(self)))]
+        kept = self._overlay.kept
+        if index < 0:
+            index += len(self)
+        if 0 <= index < kept:
+            return self._base[self._overlay.moved.get(index, index)]
+        if kept <= index < len(self):
+            return self._added[index - kept]
+        raise IndexError('word index out of range')
+
+class _OverlayWordSet(Set):
+    """Not used by itself, word set of an updated lexicon read through an _Overlay"""
+    __slots__ = ('_base', '_overlay')
+
+    def __init__(self, base, overlay):
+        self._base = base
+        self._overlay = overlay
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+    def __contains__(self, word):
+        overlay = self._overlay
+        return word in overlay.added_set or \
+               (word in self._base and word not in overlay.removed)
+
+    def __len__(self):
+        return len(self._base) - len(self._overlay.removed) + len(self._overlay.added)
+
+    def __iter__(self):
+        return chain(filterfalse(self._overlay.removed.__contains__, self._base),
+                     self._overlay.added)
+
+class _OverlayAnagramIndex(Mapping):
+    """Not used by itself, anagram index of an updated lexicon: the changed classes
+    of an _Overlay (empty once every word of theirs is removed) over the base index
+    """
+    __slots__ = ('_base', '_changed')
+
+    def __init__(self, base, changed):
+        self._base = base
+        self._changed = changed
+
+    def __getitem__(self, signature):
+        words = self._changed.get(signature)
+        if words is None:
+            return self._base[signature]
+        if not words:
+            raise KeyError(signature)
+        return words
+
+    def __len__(self):
+        return len(self._base) + sum(bool(words) - (signature in self._base) for \
+                                     signature, words in self._changed.items())
+
+    def __iter__(self):
+        changed = self._changed
+        return chain(filterfalse(changed.__contains__, self._base),
+                     (signature for signature, words in changed.items() if words))
+
+class _OverlayPool(Sequence):
+    """Not used by itself, anagram pool of an updated lexicon: each size's part of the
+    base pool, with the words of changed classes left as holes (None), followed by the
+    changed classes of that size. ends[n] is where the words with at least n anagrams
+    end, holes included, like anagram_pool_counts does for a pool without holes
+    """
+    __slots__ = ('_pool', '_changed', '_signature', '_parts', '_starts', 'ends')
+
+    def __init__(self, pool, counts, changed, signature):
+        self._pool = pool
+        self._changed = changed
+        self._signature = signature
+        joining = {} # size: words of the changed classes of that size
+        for words in changed.values():
+            if len(words) > 1:
+                joining.setdefault(len(words), []).extend(words)
+        self._parts = [] # (start, end, joining words), largest size first
+        self._starts = [] # where each part starts
+        largest = max([len(counts)] + list(joining))
+        self.ends = [0]*largest
+        total = 0
+        for size in range(largest, 1, -1):
+            start = counts[size] if size < len(counts) else 0
+            end = counts[size-1] if size <= len(counts) else 0
+            if end > start or size in joining:
+                self._parts.append((start, end, joining.get(size, ())))
+                self._starts.append(total)
+                total += end - start + len(joining.get(size, ()))
+            self.ends[size-1] = total
+        self.ends[0] = total
+
+    def __len__(self):
+        return self.ends[0]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('pool index out of range')
+        part = bisect_right(self._starts, index) - 1
+        start, end, joining = self._parts[part]
+        offset = start + index - self._starts[part]
+        if offset < end:
+            word = self._pool[offset]
+            return None if self._signature(word) in self._changed else word
+        return joining[offset - end]
+
+_GRAPH_LOCK = threading.RLock() # word graphs are built one at a time, see Lexicon.word_graph
+
+@contextmanager
+def _gc_paused():
+    """Not used by itself, disables the cyclic garbage collector while in the with block"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+class Lexicon:
+    """Word list with constant time membership and the indexes the engine needs\n
+    Lexicons are independent of each other, so several word lists may be used
+    side by side. The module level LEXICON is only the default one.
+    """
+    def __init__(self, words=(), language=None):
+        """words may be any iterable, including a generator such as iter_dictionary,
+        and is indexed one word at a time. Words are normalized by language (default
+        LANGUAGE) first, and repeated words are only kept once\n
+        Lexicons of compiled dictionaries (see load_compiled_dictionary and
+        attach_dictionary) read words, word_set, anagram_index and anagram_pool in place
+        from their block instead, as read only sequences, sets and mappings
+        """
+        self.language = LANGUAGE if language is None else language
+        self.words = []
+        self.word_set = set()
+        self.anagram_index = {} # signature: list of words with that signature
+        with _gc_paused(): # the index only adds objects, collecting meanwhile finds nothing
+            normalize = self.language.normalize
+            for word in words:
+                word = normalize(word)
+                if word is not None and word not in self.word_set:
+                    self._index_word(word, self._signature(word))
+            self.anagram_pool, self.anagram_pool_counts = \
+                build_anagram_pool(self.anagram_index)
+        self._letter_counts = {} # word: count_letters(word), filled as words are used
+        self._letter_matrix = None # (alphabet, matrix), built on first use
+        self._word_graph = None # WordGraph, built on first use
+        self._lowered_index = None # lowercased word: list of word indexes, built with the graph
+        self._word_scores = None # scrabble score of each word, built on first use
+        self._rack_index = None # RackIndex, built on first use
+        self._score_order = None # word indexes from the best scoring word, built on first use
+        self._score_matrix = None # letter matrix rows in score order, built on first use
+        self._buffer = None # mmap or shared memory block a compiled lexicon reads from
+        self._base = None # lexicon an updated lexicon reads through its overlay
+        self._overlay = None # _Overlay of the words changed from the base
+        self._positions = None # word: index in words, built on first use if needed
+        self.query_cache = QueryCache() # results of possible_words and best_words
+
+    def _signature(self, word):
+        """Not used by itself, get_signature of a normalized word"""
+        return ''.join(sorted(word)) if self.language.fold_case else get_signature(word)
+
+    def _index_word(self, word, signature):
+        """Not used by itself, adds a new word to the word list, set and anagram index\n
+        Words keep their dictionary order inside each anagram class
+        """
+        self.words.append(word)
+        self.word_set.add(word)
+        if signature in self.anagram_index:
+            self.anagram_index[signature].append(word)
+        else:
+            self.anagram_index[signature] = [word]
+
+    def _index(self, word):
+        """Not used by itself, returns the index of a word of the lexicon in words\n
+        Compiled lexicons look it up in their hash table and others in the lowered index
+        if the word graph was built, or else in a dict of every word built on first use
+        """
+        if isinstance(self.word_set, _BlockWordSet):
+            return self.word_set.find(word)
+        if self._lowered_index is not None:
+            for index in self._lowered_index[word.lower()]:
+                if self.words[index] == word:
+                    return index
+        if self._positions is None:
+            self._positions = dict(zip(self.words, count()))
+        return self._positions[word]
+
+    def __contains__(self, word):
+        return word in self.word_set
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def letter_counts(self, word):
+        """word -> lexicon.letter_counts(word) -> dict of letter: letter_count\n
+        Same as count_letters but remembered for words in the lexicon
+        """
+        try:
+            return self._letter_counts[word]
+        except KeyError:
+            if word not in self.word_set:
+                return count_letters(word)
+            # words of the lexicon are already lowercase if the language folds case
+            letters_counts = self._letter_counts[word] = \
+                tally_letters(word) if self.language.fold_case else count_letters(word)
+            return letters_counts
+
+    def letter_matrix(self):
+        """lexicon.letter_matrix() -> (alphabet, matrix)\n
+        alphabet is a dict of letter: column and matrix is a numpy uint8 array where
+        matrix[i, alphabet[letter]] is the count of letter in words[i] (capped at 255)\n
+        Built once on first use, requires numpy
+        """
+        if self._letter_matrix is None:
+            self._letter_matrix = build_letter_matrix(self.words)
+        return self._letter_matrix
+
+    def word_scores(self):
+        """lexicon.word_scores() -> sequence of the score of each word in its language\n
+        Built once on first use, letters that have no score count as 0
+        """
+        if self._word_scores is None:
+            if self._overlay is not None:
+                self._word_scores = _OverlaySequence(
+                    self._base.word_scores(), self._overlay,
+                    array('I', map(self.language.score, self._overlay.added)))
+            else:
+                self._word_scores = array('I', map(self.language.score, self.words))
+        return self._word_scores
+
+    def score_order(self):
+        """lexicon.score_order() -> sequence of every word index, best word first\n
+        Words are ordered by scrabble score, then length, both highest first, then
+        dictionary order. Built once on first use
+        """
+        if self._score_order is None:
+            scores, words = self.word_scores(), self.words
+            self._score_order = array('I', sorted(range(len(words)), key=lambda index: \
+                                                  (-scores[index], -len(words[index]))))
+        return self._score_order
+
+    def score_matrix(self):
+        """lexicon.score_matrix() -> rows of letter_matrix in score_order\n
+        A copy of the letter matrix, built once on first use, requires numpy
+        """
+        if self._score_matrix is None:
+            _, matrix = self.letter_matrix()
+            self._score_matrix = matrix[numpy.frombuffer(self.score_order(), numpy.uint32)]
+        return self._score_matrix
+
+    def rack_index(self):
+        """lexicon.rack_index() -> RackIndex of the lexicon, built once on first use"""
+        if self._rack_index is None:
+            self._rack_index = RackIndex(self)
+        return self._rack_index
+
+    def word_graph(self):
+        """lexicon.word_graph() -> WordGraph of the lexicon, built and minimized once on
+        first use\n
+        An updated lexicon's graph is the base graph with only the changed words' paths
+        copied, searches use the base graph itself
+        """
+        if self._word_graph is not None:
+            return self._word_graph
+        with _GRAPH_LOCK: # a second caller waits for the graph instead of building another
+            if self._word_graph is None and self._overlay is not None:
+                self._word_graph = self._overlay.word_graph()
+            elif self._word_graph is None:
+                lowered_index = {}
+                for index, word in enumerate(self.words):
+                    lowered_index.setdefault(word.lower(), []).append(index)
+                word_graph = WordGraph(lowered_index)
+                word_graph.minimize()
+                # the trie backend reads _lowered_index once _word_graph is set, so first
+                self._lowered_index = lowered_index
+                self._word_graph = word_graph
+        return self._word_graph
+
+    def rack_vectors(self, racks):
+        """racks -> lexicon.rack_vectors(racks) -> numpy uint8 array of letter counts\n
+        One row per rack, in the columns of letter_matrix. Letters that no word
+        uses are dropped since they can never help make a word
+        """
+        alphabet, _ = self.letter_matrix()
+        vectors = numpy.zeros((len(racks), len(alphabet)), numpy.uint8)
+        for row, chars in enumerate(racks):
+            for letter, count in count_letters(chars).items():
+                if letter in alphabet:
+                    vectors[row, alphabet[letter]] = min(count, 255)
+        return vectors
+
+    def updated(self, added=(), removed=()):
+        """lexicon.updated(added, removed) -> new Lexicon with the words of added and
+        without those of removed\n
+        This lexicon is left unchanged, so rounds still using it are not affected. The
+        new lexicon reads the base lexicon (this one, or the one this was updated from)
+        through an overlay of the changed words: their set, anagram classes and places
+        in words. Removed words are replaced by the last base words, so no other word
+        changes place. Updating costs about the same whatever the size of the lexicon,
+        and a compiled or attached lexicon is still read in place. Searches run on the
+        base and only the words of the overlay are checked again with fits, the word
+        graph and scores of the base are patched on first use. Once more than
+        OVERLAY_LIMIT words changed from the base, they are merged into a new base:
+        compiled again into a new buffer if the base was compiled, otherwise copied and
+        patched. Words are normalized like in the constructor and a word in both added
+        and removed is kept. Returns this lexicon if nothing changes
+        """
+        normalize, signature = self.language.normalize, self._signature
+        added = dict.fromkeys(word for word in map(normalize, added) if word is not None)
+        removed = {word for word in map(normalize, removed) if \
+                   word in self.word_set and word not in added}
+        added = [word for word in added if word not in self.word_set]
+        if not added and not removed:
+            return self
+        base = self if self._base is None else self._base
+        overlay = _Overlay(base) if self._overlay is None else self._overlay.copy()
+        for word in removed:
+            overlay.remove(word, signature(word))
+        for word in added:
+            overlay.add(word, signature(word))
+        lexicon = Lexicon(language=self.language)
+        lexicon._base, lexicon._overlay = base, overlay
+        lexicon._letter_counts = self._letter_counts # counts of a word never change
+        lexicon._buffer = base._buffer
+        lexicon.words = _OverlaySequence(base.words, overlay, overlay.added)
+        lexicon.word_set = _OverlayWordSet(base.word_set, overlay)
+        lexicon.anagram_index = _OverlayAnagramIndex(base.anagram_index, overlay.changed)
+        lexicon.anagram_pool = _OverlayPool(base.anagram_pool, base.anagram_pool_counts,
+                                            overlay.changed, base._signature)
+        lexicon.anagram_pool_counts = overlay.pool_counts()
+        if len(overlay) > OVERLAY_LIMIT:
+            return lexicon._merged()
+        return lexicon
+
+    def _merged(self):
+        """Not used by itself, returns a lexicon of the words of an updated lexicon
+        without an overlay, compiled into a new buffer if its base was compiled
+        """
+        base, overlay = self._base, self._overlay
+        if base._buffer is None: # base words that were added back again are kept
+            added = [word for word in overlay.added if word not in overlay.removed]
+            return base._patched(added, overlay.removed - overlay.added_set)
+        buffer = b''.join(_compiled_chunks(self))
+        lexicon = _read_compiled(buffer, buffer, self.language)
+        lexicon._letter_counts = self._letter_counts
+        if base._word_graph is not None: # kept rather than built again by a search
+            word_graph = self.word_graph()
+            lowered_index = {}
+            for index, word in enumerate(lexicon.words):
+                lowered_index.setdefault(word.lower(), []).append(index)
+            lexicon._lowered_index = lowered_index
+            lexicon._word_graph = word_graph
+        return lexicon
+
+    def _patched(self, added, removed):
+        """Not used by itself, returns a new lexicon with the normalized words of added
+        (none of them in the lexicon) and without those of removed, all of them in it\n
+        The word set, anagram index and pool, and the letter matrix, scores and word
+        graph if they were built, are copied and patched instead of made again. The
+        score order and rack index are built again on first use
+        """
+        signature = self._signature
+        lexicon = Lexicon(language=self.language)
+        lexicon._letter_counts = self._letter_counts # counts of a word never change
+
+        # anagram classes are copied the first time they change
+        anagram_index = lexicon.anagram_index = dict(self.anagram_index.items())
+        changed = {} # signature: old anagram class
+        def anagram_class(word):
+            key = signature(word)
+            if key not in changed:
+                changed[key] = self.anagram_index.get(key, ())
+                anagram_index[key] = list(changed[key])
+            return anagram_index[key]
+        for word in removed:
+            anagram_class(word).remove(word)
+        for word in added:
+            anagram_class(word).append(word)
+        for key in changed:
+            if not anagram_index[key]:
+                del anagram_index[key]
+        lexicon.anagram_pool, lexicon.anagram_pool_counts = update_anagram_pool(
+            self.anagram_pool, self.anagram_pool_counts,
+            [(old_class, anagram_index.get(key, ())) for key, old_class in changed.items()])
+        lexicon.word_set = self.word_set - removed
+        lexicon.word_set.update(added)
+
+        # removed words are replaced by the last words, so no other word changes place
+        words = lexicon.words = list(self.words)
+        if self._lowered_index is not None:
+            positions = [index for word in removed for \
+                         index in self._lowered_index[word.lower()] if words[index] == word]
+        else:
+            positions = compress(count(), map(removed.__contains__, words))
+        positions = sorted(positions, reverse=True)
+        sources = {} # new place: old place of the words that moved
+        for position in positions:
+            last = len(words) - 1
+            if position != last:
+                words[position] = words[last]
+                sources[position] = sources.pop(last, last)
+            else:
+                sources.pop(last, None)
+            words.pop()
+        kept = len(words)
+        words.extend(added)
+
+        if self._word_scores is not None:
+            scores = array('I')
+            scores.frombytes(memoryview(self._word_scores).cast('B')[:kept*scores.itemsize])
+            for position, source in sources.items():
+                scores[position] = self._word_scores[source]
+            scores.extend(map(self.language.score, added))
+            lexicon._word_scores = scores
+        if self._letter_matrix is not None:
+            alphabet, matrix = self._letter_matrix
+            if all(letter in alphabet for word in added for letter in word.lower()):
+                new_matrix = numpy.zeros((len(words), len(alphabet)), numpy.uint8)
+                new_matrix[:kept] = matrix[:kept]
+                for position, source in sources.items():
+                    new_matrix[position] = matrix[source]
+                for row, word in enumerate(added, kept):
+                    for letter, letter_count in count_letters(word).items():
+                        new_matrix[row, alphabet[letter]] = min(letter_count, 255)
+                lexicon._letter_matrix = (alphabet, new_matrix)
+            # otherwise a new letter needs a new column, the matrix is built again
+        if self._word_graph is not None:
+            # lowered word lists are copied the first time they change
+            lowered_index = dict(self._lowered_index)
+            changed = {} # lowered word: True if it was in the graph
+            def lowered_indexes(word):
+                lowered = word.lower()
+                if lowered not in changed:
+                    changed[lowered] = lowered in self._lowered_index
+                    lowered_index[lowered] = list(self._lowered_index.get(lowered, ()))
+                return lowered_index[lowered]
+            for position in positions:
+                indexes = lowered_indexes(self.words[position])
+                indexes.remove(position)
+            for position, source in sources.items():
+                indexes = lowered_indexes(words[position])
+                indexes[indexes.index(source)] = position
+            for index, word in enumerate(added, kept):
+                lowered_indexes(word).append(index)
+            for lowered, was_in_graph in list(changed.items()):
+                if lowered_index[lowered]:
+                    if was_in_graph:
+                        del changed[lowered]
+                else:
+                    del lowered_index[lowered]
+            lexicon._lowered_index = lowered_index
+            lexicon._word_graph = self._word_graph.updated(
+                [lowered for lowered, was_in_graph in changed.items() if not was_in_graph],
+                [lowered for lowered, was_in_graph in changed.items() if was_in_graph])
+        return lexicon
+
 DICTIONARY = ()
+LEXICON = Lexicon()
 
 def set_dictionary(buffer):
-    """Sets the global DICTIONARY variable"""
-    global DICTIONARY
-    DICTIONARY = tuple(buffer)
+    """Sets the default LEXICON (and the global DICTIONARY variable)\n
+    Accepts a Lexicon or an iterable of words. Query results are cached per lexicon,
+    so none of the previous dictionary's are used once it is replaced
+    """
+    global DICTIONARY, LEXICON
+    LEXICON = buffer if isinstance(buffer, Lexicon) else Lexicon(buffer)
+    DICTIONARY = LEXICON.words
+
+def _get_lexicon(lexicon):
+    """Returns lexicon, or the default LEXICON if it is None"""
+    return LEXICON if lexicon is None else lexicon
+
+_UPDATE_LOCK = threading.Lock() # updates of the default LEXICON are made one at a time
+
+def update_dictionary(added=(), removed=(), lexicon=None):
+    """Applies a batch of added and removed words to a lexicon (default LEXICON) and
+    returns the updated Lexicon, see Lexicon.updated\n
+    The lexicon itself is left unchanged so the rounds using it are not affected. If it
+    is the default LEXICON, the updated lexicon replaces it as set_dictionary does
+    """
+    with _UPDATE_LOCK:
+        lexicon = _get_lexicon(lexicon)
+        updated = lexicon.updated(added, removed)
+        if lexicon is LEXICON:
+            set_dictionary(updated)
+    return updated
+
+def is_word(word, lexicon=None):
+    """word -> is_word(word) -> True if word is in the lexicon else False\n
+    word is normalized for the lexicon's language first, like its words were
+    """
+    lexicon = _get_lexicon(lexicon)
+    word = lexicon.language.normalize(word)
+    return word is not None and word in lexicon.word_set
+
+def iter_dictionary(filename, deduplicate=True):
+    """Accepts a filename, yields its words one line at a time\n
+    Any line ending is accepted, surrounding whitespace is stripped, blank lines and
+    lines starting with # are skipped and repeated words are only yielded once unless
+    deduplicate is False. Words are yielded as written, Lexicon normalizes them
+    """
+    seen = set()
+    with open(filename, 'r') as textfile:
+        for line in textfile:
+            word = line.strip()
+            if not word or word.startswith('#'):
+                continue
+            if deduplicate:
+                if word in seen:
+                    continue
+                seen.add(word)
+            yield word
 
 def open_dictionary(filename):
     """Accepts a filename, Returns a tuple of words"""
-    with open(filename, 'r') as textfile:
-        buffer = tuple(textfile.read().splitlines())
-    return buffer
+    return tuple(iter_dictionary(filename))
 
-def get_score(word):
-    """word -> get_score(word) -> integer scrabble score"""
-    word = word.lower()
-    sums = 0
-    for letter in word:
-        sums += SCRABBLE[letter]
-    return sums
+def load_dictionary(filename, language=None):
+    """Accepts a filename, Returns a Lexicon of its words in language (default LANGUAGE)\n
+    Uses the compiled dictionary made by compile_dictionary when it is present and
+    up to date, otherwise reads the text file like open_dictionary
+    """
+    try:
+        return load_compiled_dictionary(filename, language)
+    except (OSError, ValueError):
+        # the lexicon removes repeated words itself while it indexes the stream
+        return Lexicon(iter_dictionary(filename, deduplicate=False), language=language)
+
+def _file_digest(filename):
+    """Returns the sha256 digest of a file's contents"""
+    digest = sha256()
+    with open(filename, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+def _compiled_sections(lexicon):
+    """Not used by itself, returns the byte sections of a compiled lexicon in the order
+    of CACHE_SECTIONS
+    """
+    words = lexicon.words
+    encoded = [word.encode('utf-8', 'surrogateescape') for word in words]
+    if numpy is not None:
+        alphabet, matrix = lexicon.letter_matrix()
+        matrix = matrix.tobytes()
+    else: # same layout as build_letter_matrix, built without numpy
+        alphabet = {letter: column for column, letter in \
+                    enumerate(sorted(set(''.join(words).lower())))}
+        matrix = bytearray(len(words) * len(alphabet))
+        for row, word in enumerate(words):
+            for letter, letter_count in count_letters(word).items():
+                matrix[row*len(alphabet) + alphabet[letter]] = min(letter_count, 255)
+    # open addressing with linear probing, at most half full
+    size = 1
+    while size < 2*len(encoded):
+        size *= 2
+    table, mask = array('I', bytes(4*size)), size - 1
+    for index, data in enumerate(encoded, 1):
+        slot = _word_hash(data) & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = index
+    # anagram classes by signature in byte order, as the index bisects them
+    positions = dict(zip(words, count()))
+    pool, pool_counts = lexicon.anagram_pool, lexicon.anagram_pool_counts
+    if isinstance(pool, _OverlayPool): # without the holes of an updated lexicon's pool
+        pool, pool_counts = build_anagram_pool(lexicon.anagram_index)
+    anagram_classes = sorted(zip([signature.encode('utf-8', 'surrogateescape') for \
+                                  signature in lexicon.anagram_index],
+                                 lexicon.anagram_index.values()))
+    signatures = [data for data, _ in anagram_classes]
+    members = array('I', [positions[word] for _, anagram_class in anagram_classes for \
+                          word in anagram_class])
+    classes = array('I', accumulate(map(len, (anagram_class for \
+                                              _, anagram_class in anagram_classes)),
+                                    initial=0))
+    def offsets(items):
+        return array('Q', accumulate(map((1).__add__, map(len, items)), initial=0))
+    return (''.join(alphabet).encode('utf-8'), b'\n'.join(encoded), b'\n'.join(signatures),
+            lexicon.language.name.encode('utf-8'), matrix,
+            array('I', lexicon.word_scores()).tobytes(), offsets(encoded).tobytes(),
+            offsets(signatures).tobytes(), table.tobytes(), classes.tobytes(),
+            members.tobytes(), array('I', map(positions.__getitem__, pool)).tobytes(),
+            array('I', pool_counts).tobytes())
+
+def _compiled_chunks(lexicon, mtime_ns=0, size=0, digest=bytes(32)):
+    """Not used by itself, returns the header and sections of a compiled lexicon, with
+    the padding that makes each section start at a multiple of 8 bytes
+    """
+    with _gc_paused(): # the tables only add objects, collecting meanwhile finds nothing
+        sections = _compiled_sections(lexicon)
+    chunks = [CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, mtime_ns, size, digest,
+                                len(lexicon.words), *map(len, sections))]
+    for section in sections:
+        chunks.append(section)
+        chunks.append(bytes(-len(section) % 8))
+    return chunks
+
+def compile_dictionary(filename, lexicon=None, language=None):
+    """Accepts a dictionary filename and writes its compiled sidecar next to it\n
+    The sidecar holds the normalized words with the hash table, anagram index and pool
+    to look them up, the letter count matrix and scores in language (default LANGUAGE)
+    so load_dictionary can map them instead of rebuilding them. lexicon may be given if
+    the file was already loaded, its language is then used. Returns the sidecar filename
+    """
+    status = os.stat(filename)
+    digest = _file_digest(filename)
+    if lexicon is None:
+        lexicon = Lexicon(iter_dictionary(filename, deduplicate=False), language=language)
+    chunks = _compiled_chunks(lexicon, status.st_mtime_ns, status.st_size, digest)
+    cache_filename = filename + CACHE_SUFFIX
+    temp_filename = '{}.{}.tmp'.format(cache_filename, os.getpid())
+    with open(temp_filename, 'wb') as cache:
+        for chunk in chunks:
+            cache.write(chunk)
+    os.replace(temp_filename, cache_filename)
+    return cache_filename
+
+def load_compiled_dictionary(filename, language=None):
+    """Accepts a dictionary filename and returns a Lexicon loaded from its compiled sidecar\n
+    The sidecar is memory mapped and read in place, so loading takes about the same time
+    whatever the size of the dictionary and its pages are shared with every other process
+    using the same file. Raises ValueError if the sidecar is missing a valid header, is
+    out of date with the dictionary file or was compiled for another language than
+    language (default LANGUAGE)
+    """
+    status = os.stat(filename)
+    with open(filename + CACHE_SUFFIX, 'rb') as cache:
+        buffer = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+    mtime_ns, size, digest = _read_compiled_header(buffer)[:3]
+    # an unchanged mtime and size is trusted, otherwise the contents must still match
+    if size != status.st_size or \
+       (mtime_ns != status.st_mtime_ns and digest != _file_digest(filename)):
+        raise ValueError('Compiled dictionary is out of date')
+    return _read_compiled(buffer, buffer, LANGUAGE if language is None else language)
+
+def _read_compiled_header(buffer):
+    """Not used by itself, returns the header fields of a compiled lexicon after the
+    magic and version, raises ValueError if they are missing or unsupported
+    """
+    if len(buffer) < CACHE_HEADER.size:
+        raise ValueError('Compiled dictionary is truncated')
+    magic, version, *fields = CACHE_HEADER.unpack_from(buffer)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        raise ValueError('Compiled dictionary has an unsupported format')
+    return fields
+
+def _read_compiled(buffer, owner, language=None):
+    """Not used by itself, returns the Lexicon of a compiled lexicon in buffer\n
+    Words, word set, anagram index and pool, letter matrix and scores are all read only
+    views of buffer, so nothing is copied. owner is kept by the lexicon so that buffer
+    stays open as long as it is used. Raises ValueError if language is given and the
+    lexicon was compiled for another one
+    """
+    count, *lengths = _read_compiled_header(buffer)[3:]
+    view = memoryview(buffer).toreadonly()
+    sections = {}
+    offset = CACHE_HEADER.size
+    for name, length in zip(CACHE_SECTIONS, lengths):
+        sections[name] = view[offset:offset+length]
+        offset += length + -length % 8
+    # shared memory may be rounded up to whole pages, so only a short buffer is invalid
+    if len(buffer) < offset - (-lengths[-1] % 8):
+        raise ValueError('Compiled dictionary is truncated')
+    alphabet = str(sections['alphabet'], 'utf-8')
+    language_name = str(sections['language'], 'utf-8')
+    if language is None:
+        language = get_language(language_name)
+    elif language.name != language_name:
+        raise ValueError('Compiled dictionary is in another language')
+    lexicon = Lexicon(language=language)
+    words = _BlockWords(sections['words'], sections['word_offsets'].cast('Q'))
+    lexicon.words = words
+    lexicon.word_set = _BlockWordSet(words, sections['word_table'].cast('I'))
+    lexicon.anagram_index = _BlockAnagramIndex(
+        words, _BlockWords(sections['signatures'], sections['signature_offsets'].cast('Q')),
+        sections['classes'].cast('I'), sections['members'].cast('I'))
+    lexicon.anagram_pool = _BlockPool(words, sections['pool'].cast('I'))
+    lexicon.anagram_pool_counts = sections['pool_counts'].cast('I').tolist()
+    if numpy is not None:
+        lexicon._letter_matrix = ({letter: column for column, letter in enumerate(alphabet)},
+                                  numpy.frombuffer(sections['matrix'], numpy.uint8)
+                                  .reshape(count, len(alphabet)))
+    lexicon._word_scores = sections['scores'].cast('I')
+    lexicon._buffer = owner
+    return lexicon
+
+_SHARED_BLOCKS = set() # names of the blocks made by share_dictionary in this process
+
+def share_dictionary(lexicon=None, name=None):
+    """Copies a lexicon (default LEXICON) into a new shared memory block\n
+    Returns the multiprocessing.shared_memory.SharedMemory, whose name other processes
+    pass to attach_dictionary. The block uses the compiled dictionary layout, so attached
+    lexicons read it in place instead of copying it.
+    The caller owns the block: close and unlink it once no process attaches any more
+    """
+    chunks = _compiled_chunks(_get_lexicon(lexicon))
+    block = shared_memory.SharedMemory(name, create=True, size=sum(map(len, chunks)))
+    _SHARED_BLOCKS.add(block.name)
+    offset = 0
+    for chunk in chunks:
+        block.buf[offset:offset+len(chunk)] = chunk
+        offset += len(chunk)
+    return block
+
+def attach_dictionary(name):
+    """Accepts the name of a block made by share_dictionary and returns its Lexicon\n
+    Nothing is rebuilt: lookups read the block in place and words are only made as
+    str when they are returned, so attaching takes milliseconds and the block's pages
+    are shared by every attached process. The word graph and score order are still
+    built in the process on first use. The lexicon's language must be registered in
+    this process, see register_language
+    """
+    try:
+        block = shared_memory.SharedMemory(name, track=False) # Python 3.13 and later
+    except TypeError:
+        block = shared_memory.SharedMemory(name)
+        # the block belongs to the process that shared it, a resource tracker of this
+        # process's own must not unlink it when this process exits. Processes started
+        # by multiprocessing use the tracker of the process that started them, where
+        # the block is already registered and unregistering would forget it
+        if os.name == 'posix' and name not in _SHARED_BLOCKS and parent_process() is None:
+            resource_tracker.unregister(block._name, 'shared_memory')
+    return _read_compiled(block.buf, block)
+
+class DictionaryWatcher:
+    """Keeps a lexicon (default LEXICON) in step with its dictionary file\n
+    A background thread checks the file's modification time and size every interval
+    seconds. When they change, the words added to and removed from the file are
+    applied with update_dictionary, so only they are indexed again. Words are compared
+    once normalized by the lexicon's language, so lines spelling the same word count as
+    one. Each change reads and normalizes the whole file again to find them, in the
+    watching thread, so it costs about as much as iter_dictionary over the file while
+    the update itself only depends on the changed words, see Lexicon.updated.
+    Counts and the duration of the last update are kept in stats
+    """
+    def __init__(self, filename, interval=WATCH_INTERVAL, lexicon=None):
+        self.filename = filename
+        self.interval = interval
+        self.lexicon = _get_lexicon(lexicon) # latest update of the watched lexicon
+        self.stats = {'checks': 0, 'updates': 0, 'errors': 0, 'added': 0, 'removed': 0,
+                      'update_seconds_last': 0.0, 'update_seconds_max': 0.0}
+        status = os.stat(filename)
+        self._version = (status.st_mtime_ns, status.st_size)
+        self._words = self._read_words()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the watching thread"""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._watch, name='dictionary-watcher',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the watching thread and waits for it to finish"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def check(self):
+        """Applies the changes of the file since the last check, if any\n
+        Returns the updated lexicon, None if the file did not change.
+        Raises OSError if the file cannot be read
+        """
+        self.stats['checks'] += 1
+        status = os.stat(self.filename)
+        version = (status.st_mtime_ns, status.st_size)
+        if version == self._version:
+            return None
+        words = self._read_words()
+        added, removed = words - self._words, self._words - words
+        start = perf_counter()
+        self.lexicon = update_dictionary(added, removed, self.lexicon)
+        seconds = perf_counter() - start
+        self._version, self._words = version, words
+        self.stats['updates'] += 1
+        self.stats['added'] += len(added)
+        self.stats['removed'] += len(removed)
+        self.stats['update_seconds_last'] = seconds
+        self.stats['update_seconds_max'] = max(self.stats['update_seconds_max'], seconds)
+        return self.lexicon
+
+    def _read_words(self):
+        """Not used by itself, returns the set of normalized words of the file"""
+        normalize = self.lexicon.language.normalize
+        return {word for word in map(normalize, iter_dictionary(self.filename,
+                                                                deduplicate=False)) \
+                if word is not None}
+
+    def _watch(self):
+        """Not used by itself, thread target that checks the file every interval"""
+        while not self._stopping.wait(self.interval):
+            try:
+                self.check()
+            except OSError: # being replaced, or gone for now, checked again later
+                self.stats['errors'] += 1
+
+def get_score(word, lexicon=None):
+    """word -> get_score(word) -> integer scrabble score\n
+    Scored with the language of the lexicon, characters it does not score count as 0
+    """
+    return _get_lexicon(lexicon).language.score(word)
 
 def count_letters(word):
     """word -> count_letters(word) -> dict of letter: letter_count\n
     Note: letters are all treated as lowercase and returns in lowercase
     """
-    word = word.lower()
+    return tally_letters(word.lower())
+
+def tally_letters(word):
+    """Same as count_letters for a word that is already lowercase"""
     letters_counts = {} # letter: count
     for letter in word:
         if letter in letters_counts:
@@ -47,21 +1541,23 @@ def count_letters(word):
             letters_counts[letter] = 1
     return letters_counts
 
-def makeable(chars, word):
+def makeable(chars, word, lexicon=None):
     """characters, word -> makeable(characters, word)\n
     Returns True if word is makeable using letters in chars else False
-    Note: letters are all treated as lowercase and returns in lowercase
+    Note: letters are all treated as lowercase and returns in lowercase\n
+    Letter counts of words in the lexicon are reused between calls
     """
-    chars, word = chars.lower(), word.lower()
-    letter_intersect = set(chars) & set(word)
-    if len(letter_intersect) == len(set(word)):
-        chars_letter_count = count_letters(chars)
-        word_letter_count = count_letters(word)
-        for letter in letter_intersect:
-            if word_letter_count[letter] > chars_letter_count[letter]:
-                return False
-        return True
-    return False
+    lexicon = _get_lexicon(lexicon)
+    return fits(count_letters(chars), lexicon.letter_counts(word))
+
+def fits(chars_letter_count, word_letter_count):
+    """Returns True if every letter count in word_letter_count is covered by\n
+    chars_letter_count, both as returned by count_letters
+    """
+    for letter, count in word_letter_count.items():
+        if count > chars_letter_count.get(letter, 0):
+            return False
+    return True
 
 def combine_words(words):
     """Accepts list of words and returns a single string where all words can be made\n
@@ -76,75 +1572,854 @@ def combine_words(words):
     return ''.join(''.join(key for _ in range(value)) for \
                     key, value in sorted(tuple(letters_max.items()), key=lambda item: item[0]))
 
-def possible_words(chars):
-    """Accepts a string and returns all words that may be made by that string in a list"""
-    words = []
-    for word in DICTIONARY:
-        if makeable(chars, word):
-            words.append(word)
-    return words
+def set_backend(backend):
+    """Sets the default backend used by possible_words, one of BACKENDS"""
+    global BACKEND
+    if backend not in BACKENDS:
+        raise ValueError('Unknown backend {!r}, expected one of {}'.format(backend, BACKENDS))
+    if backend == 'numpy' and numpy is None:
+        raise ValueError("The 'numpy' backend requires numpy to be installed")
+    BACKEND = backend
+
+def possible_words(chars, lexicon=None, backend=None, cache=True):
+    """Accepts a string and returns all words that may be made by that string in a list\n
+    Words are returned in dictionary order whichever backend is used
+    """
+    return possible_words_batch((chars,), lexicon, backend, cache)[0]
+
+def possible_words_batch(racks, lexicon=None, backend=None, cache=True):
+    """Accepts a sequence of strings and returns possible_words of each in a list"""
+    lexicon = _get_lexicon(lexicon)
+    return [[lexicon.words[index] for index in indexes] for \
+            indexes in possible_indexes_batch(racks, lexicon, backend, cache)]
+
+def possible_indexes_batch(racks, lexicon=None, backend=None, cache=True):
+    """Same as possible_words_batch but returns the indexes of the words in lexicon.words\n
+    Racks with the same letters share one result in the lexicon's query cache, only
+    the racks missing from it are searched. With cache False the query cache is neither
+    read nor filled, for one-off batches that would only evict the results worth keeping
+    """
+    lexicon = _get_lexicon(lexicon)
+    backend = BACKEND if backend is None else backend
+    keys = [('words', get_signature(chars)) for chars in racks]
+    found = {} # key: tuple of indexes
+    missing = {} # key: rack, racks to search
+    for key, chars in zip(keys, racks):
+        if key not in found and key not in missing:
+            indexes = lexicon.query_cache.get(key) if cache else None
+            if indexes is None:
+                missing[key] = chars
+            else:
+                found[key] = indexes
+    if missing:
+        racks = list(missing.values())
+        if lexicon._overlay is not None:
+            results = _possible_indexes_overlay(racks, lexicon, backend, cache)
+        elif backend == 'numpy':
+            results = _possible_indexes_numpy(racks, lexicon)
+        elif backend == 'trie':
+            results = [_possible_indexes_trie(chars, lexicon) for chars in racks]
+        else:
+            results = [_possible_indexes_python(chars, lexicon) for chars in racks]
+        for key, indexes in zip(missing, results):
+            found[key] = tuple(indexes)
+            if cache:
+                lexicon.query_cache.put(key, found[key])
+    return [list(found[key]) for key in keys]
+
+def _possible_indexes_overlay(racks, lexicon, backend, cache):
+    """possible_words of an updated lexicon: its base is searched with backend (and its
+    query cache), base words that are no longer at their base index are dropped and
+    the overlay's words are checked with fits instead
+    """
+    overlay = lexicon._overlay
+    kept, moved, words = overlay.kept, overlay.moved, lexicon.words
+    positions = overlay.positions()
+    results = []
+    for chars, indexes in zip(racks, possible_indexes_batch(racks, lexicon._base, backend,
+                                                            cache)):
+        chars_letter_count = count_letters(chars)
+        indexes = [index for index in indexes if index < kept and index not in moved]
+        indexes.extend(position for position in positions if \
+                       fits(chars_letter_count, lexicon.letter_counts(words[position])))
+        indexes.sort()
+        results.append(indexes)
+    return results
+
+def _possible_indexes_python(chars, lexicon):
+    """possible_words backend that checks every word with fits"""
+    if INSTRUMENTATION:
+        _record_scan('python', len(lexicon.words))
+    chars_letter_count = count_letters(chars)
+    indexes = []
+    for index, word in enumerate(lexicon.words):
+        if fits(chars_letter_count, lexicon.letter_counts(word)):
+            indexes.append(index)
+    return indexes
+
+def _possible_indexes_trie(chars, lexicon):
+    """possible_words backend that walks the lexicon word graph, so its cost depends on
+    the number of words that can be made rather than on the size of the lexicon
+    """
+    graph = lexicon.word_graph()
+    indexes = []
+    for lowered in graph.sub_words(count_letters(chars)):
+        indexes.extend(lexicon._lowered_index[lowered])
+    indexes.sort()
+    return indexes
+
+def _possible_indexes_numpy(racks, lexicon):
+    """possible_words backend that compares the lexicon letter matrix against every rack
+    at once, in chunks of words so that at most BATCH_CELLS counts are compared at a time
+    """
+    _, matrix = lexicon.letter_matrix()
+    if INSTRUMENTATION:
+        _record_scan('numpy', len(matrix), len(racks))
+    vectors = lexicon.rack_vectors(racks)[:, numpy.newaxis, :]
+    results = [[] for _ in racks]
+    chunk = max(1, BATCH_CELLS // max(1, len(racks) * matrix.shape[1]))
+    for start in range(0, len(matrix), chunk):
+        matches = (matrix[numpy.newaxis, start:start+chunk] <= vectors).all(axis=2)
+        for indexes, rack_matches in zip(results, matches):
+            indexes.extend((numpy.flatnonzero(rack_matches) + start).tolist())
+    return results
+
+def best_words(chars, k=1, lexicon=None, backend=None, cache=True):
+    """Accepts a string and returns the k best words that may be made by it in a list\n
+    Words are ranked by scrabble score, then length, both highest first, then dictionary
+    order. Only the best k are kept, the full list of possible words is never made
+    """
+    lexicon = _get_lexicon(lexicon)
+    return [lexicon.words[index] for index in best_indexes(chars, k, lexicon, backend, cache)]
 
-def find_anagrams(base_word):
+def best_indexes(chars, k=1, lexicon=None, backend=None, cache=True):
+    """Same as best_words but returns the indexes of the words in lexicon.words\n
+    Results are kept in the lexicon's query cache, unless cache is False
+    """
+    lexicon = _get_lexicon(lexicon)
+    backend = BACKEND if backend is None else backend
+    if k <= 0:
+        return []
+    key = ('best', get_signature(chars), k)
+    indexes = lexicon.query_cache.get(key) if cache else None
+    if indexes is None:
+        if lexicon._overlay is not None:
+            indexes = _best_indexes_overlay(chars, k, lexicon, backend, cache)
+        elif backend == 'numpy':
+            indexes = _best_indexes_numpy(chars, k, lexicon)
+        elif backend == 'trie':
+            indexes = _best_indexes_trie(chars, k, lexicon)
+        else:
+            indexes = _best_indexes_python(chars, k, lexicon)
+        indexes = tuple(indexes)
+        if cache:
+            lexicon.query_cache.put(key, indexes)
+    return list(indexes)
+
+def _best_indexes_overlay(chars, k, lexicon, backend, cache):
+    """best_words of an updated lexicon: the best of its base, with as many more as
+    there are base words that fit but are no longer at their base index, are ranked
+    with the overlay's words that fit
+    """
+    overlay, base = lexicon._overlay, lexicon._base
+    kept, moved, words = overlay.kept, overlay.moved, lexicon.words
+    chars_letter_count = count_letters(chars)
+    fitting = [position for position in overlay.positions() if \
+               fits(chars_letter_count, lexicon.letter_counts(words[position]))]
+    hidden = sum(fits(chars_letter_count, base.letter_counts(word)) for \
+                 word in overlay.removed) + sum(position in moved for position in fitting)
+    indexes = [index for index in best_indexes(chars, k + hidden, base, backend, cache) if \
+               index < kept and index not in moved]
+    scores = lexicon.word_scores()
+    return sorted(indexes + fitting,
+                  key=lambda index: (-scores[index], -len(words[index]), index))[:k]
+
+def _best_indexes_python(chars, k, lexicon):
+    """best_words backend that checks words from the best scoring one with fits,
+    stopping at the k-th that fits
+    """
+    chars_letter_count = count_letters(chars)
+    indexes = []
+    for index in lexicon.score_order():
+        if fits(chars_letter_count, lexicon.letter_counts(lexicon.words[index])):
+            indexes.append(index)
+            if len(indexes) == k:
+                break
+    return indexes
+
+def _best_indexes_trie(chars, k, lexicon):
+    """best_words backend that keeps the k best words of the word graph walk in a heap"""
+    graph = lexicon.word_graph()
+    scores, words = lexicon.word_scores(), lexicon.words
+    indexes = (index for lowered in graph.sub_words(count_letters(chars)) for \
+               index in lexicon._lowered_index[lowered])
+    return nlargest(k, indexes, key=lambda index: (scores[index], len(words[index]), -index))
+
+def _best_indexes_numpy(chars, k, lexicon):
+    """best_words backend that compares the score ordered letter matrix against the rack,
+    in chunks that double in size, stopping once k words fit
+    """
+    matrix = lexicon.score_matrix()
+    order = numpy.frombuffer(lexicon.score_order(), numpy.uint32)
+    vector = lexicon.rack_vectors((chars,))[0]
+    indexes = []
+    start, chunk = 0, BEST_CHUNK
+    while start < len(matrix) and len(indexes) < k:
+        rows = numpy.flatnonzero((matrix[start:start+chunk] <= vector).all(axis=1))
+        indexes.extend(order[rows[:k-len(indexes)] + start].tolist())
+        start, chunk = start + chunk, chunk*2
+    return indexes
+
+def query_cache_stats(lexicon=None):
+    """Returns a dict of the hits, misses and evictions of the lexicon's query cache,
+    with its current size and maxsize
+    """
+    cache = _get_lexicon(lexicon).query_cache
+    return dict(cache.stats, size=len(cache), maxsize=cache.maxsize)
+
+def prefix_cursor(lexicon=None):
+    """Returns an empty PrefixCursor over the word graph of the lexicon"""
+    return PrefixCursor(_get_lexicon(lexicon).word_graph())
+
+def find_anagrams(base_word, lexicon=None):
     """Accepts a word and returns all of its anagrams in a list"""
-    words = []
-    for word in DICTIONARY:
-        if len(base_word) == len(word):
-            if count_letters(base_word) == count_letters(word):
-                words.append(word)
+    lexicon = _get_lexicon(lexicon)
+    base_word = lexicon.language.normalize(base_word)
+    words = list(lexicon.anagram_index.get(lexicon._signature(base_word), ())) \
+            if base_word is not None else []
     words.remove(base_word)
     return words
 
-def get_anagram_set(at_least=1):
+def get_anagram_set(at_least=1, seed=None, lexicon=None):
     """Special function that returns a random base word and all of its anagrams\n
     Returns with syntax (base_word, anagrams)\n
-    Base word is not included in anagrams
+    Base word is not included in anagrams\n
+    Pass a seed to get a reproducible round.
+    Raises ValueError if no word has at least at_least anagrams
+    """
+    lexicon = _get_lexicon(lexicon)
+    randrange = random_randrange if seed is None else Random(seed).randrange
+    if at_least <= 0:
+        base_word = lexicon.words[randrange(len(lexicon.words))]
+    elif at_least < len(lexicon.anagram_pool_counts):
+        pool = lexicon.anagram_pool
+        # the pool of an updated lexicon has holes where its anagram classes changed
+        end = pool.ends[at_least] if isinstance(pool, _OverlayPool) else \
+              lexicon.anagram_pool_counts[at_least]
+        base_word = None
+        while base_word is None:
+            base_word = pool[randrange(end)]
+    else:
+        raise ValueError('No word has at least {} anagrams'.format(at_least))
+    return base_word, find_anagrams(base_word, lexicon)
+
+def get_words_set(k=2, at_least=3, seed=None, lexicon=None):
+    """Special function that returns letters made by combining k random words and all
+    words of at least at_least letters that can be made from them\n
+    Returns with syntax (chars, words)\n
+    Pass a seed to get a reproducible round.
+    """
+    lexicon = _get_lexicon(lexicon)
+    choices = random_choices if seed is None else Random(seed).choices
+    chars = combine_words(choices(lexicon.words, k=k))
+    return chars, [word for word in possible_words(chars, lexicon) if len(word) >= at_least]
+
+class RackIndex:
+    """Number of solvable words and their total scrabble score for a sample of racks\n
+    Racks are made like Construct Words rounds, by combining k random words, and are
+    measured once so that racks of a wanted difficulty can be picked without searching.
+    A sample only covers the bands its racks happen to fall in, grow measures more racks
+    for a band that was missed, and bands missed by generate_rack without waiting are
+    put in missed for a background thread to grow (see rounds.RoundQueue).
+    Growing is done one at a time and find may run meanwhile from other threads
+    """
+    def __init__(self, lexicon, size=RACK_SAMPLE, k=2, at_least=3, seed=None):
+        self.lexicon = lexicon
+        self.k = k
+        self.at_least = at_least
+        self.medians = {} # number of combined words: median word count of their racks
+        self.missed = Queue() # (min_words, max_words) bands to grow
+        self._choices = random_choices if seed is None else Random(seed).choices
+        # (word_counts, total_scores, racks) replaced as a whole so find reads them together
+        self._table = ([], [], [])
+        self._lock = threading.Lock() # guards growing
+        self._add(size, k)
+
+    def __len__(self):
+        return len(self._table[2])
+
+    @property
+    def word_counts(self):
+        """Solvable word count of each rack, ascending"""
+        return self._table[0]
+
+    @property
+    def total_scores(self):
+        """Total score of the solvable words of each rack"""
+        return self._table[1]
+
+    @property
+    def racks(self):
+        """Letters of each rack"""
+        return self._table[2]
+
+    def _add(self, size, k):
+        """Not used by itself, measures size new racks of k words and adds them"""
+        with self._lock:
+            lexicon = self.lexicon
+            word_counts, total_scores, known_racks = self._table
+            known = set(known_racks)
+            racks = [chars for chars in dict.fromkeys(combine_words(self._choices(
+                     lexicon.words, k=k)) for _ in range(size if lexicon.words else 0)) if \
+                     chars not in known]
+            words, scores = lexicon.words, lexicon.word_scores()
+            stats = []
+            found = possible_indexes_batch(racks, lexicon, cache=False) # one-off searches
+            for chars, indexes in zip(racks, found):
+                indexes = [index for index in indexes if len(words[index]) >= self.at_least]
+                stats.append((len(indexes), sum(scores[index] for index in indexes), chars))
+            if stats:
+                counts = sorted(word_count for word_count, _, _ in stats)
+                self.medians[k] = counts[len(counts)//2]
+            stats.extend(zip(word_counts, total_scores, known_racks))
+            stats.sort()
+            # racks ordered by word count so that a range of counts is found by bisection
+            self._table = ([word_count for word_count, _, _ in stats],
+                           [total_score for _, total_score, _ in stats],
+                           [chars for _, _, chars in stats])
+
+    def grow(self, min_words=1, max_words=None, size=RACK_SAMPLE):
+        """Measures size more racks for a band of word counts and adds them\n
+        Racks of more combined words have more solvable words, so racks combine the
+        number of words whose racks were nearest to the band, or one word less (more)
+        than any tried so far when the band is below (above) all of them
+        """
+        all_medians = dict(self.medians) # as they are now, another grow may add to them
+        def distance(k):
+            median = all_medians[k]
+            if median < min_words:
+                return min_words - median
+            return 0 if max_words is None or median <= max_words else median - max_words
+        medians = all_medians.values()
+        if max_words is not None and all(max_words < median for median in medians):
+            k = max(1, min(all_medians, default=self.k+1) - 1)
+        elif all(median < min_words for median in medians):
+            k = max(all_medians, default=self.k-1) + 1
+        else:
+            k = min(all_medians, key=distance)
+        self._add(size, k)
+
+    def find(self, min_words=1, max_words=None, min_score=0, max_score=None, seed=None):
+        """Returns a random rack whose number of solvable words and their total score
+        are within the given bounds (inclusive, None meaning unbounded)\n
+        Raises ValueError if no rack in the index is within the bounds
+        """
+        word_counts, total_scores, racks = self._table
+        start = bisect_left(word_counts, min_words)
+        end = len(racks) if max_words is None else bisect_right(word_counts, max_words)
+        matches = [index for index in range(start, end) if min_score <= \
+                   total_scores[index] and (max_score is None or \
+                                            total_scores[index] <= max_score)]
+        if not matches:
+            raise ValueError('No rack has {} to {} words scoring {} to {}'.format(
+                min_words, max_words, min_score, max_score))
+        randrange = random_randrange if seed is None else Random(seed).randrange
+        return racks[matches[randrange(len(matches))]]
+
+def generate_rack(min_words=1, max_words=None, min_score=0, max_score=None,
+                  seed=None, lexicon=None, max_racks=RACK_LIMIT, wait=True):
+    """Special function that returns letters whose solvable words are within a
+    difficulty band, and those words\n
+    Returns with syntax (chars, words) like get_words_set\n
+    min_words and max_words bound the number of words of at least 3 letters,
+    min_score and max_score bound the sum of their scrabble scores (None is unbounded).
+    Racks are picked from the lexicon's RackIndex, which grows by RACK_SAMPLE racks at a
+    time while no rack is within the band, up to max_racks racks. Narrow or unusual
+    bands can still be missed, and each growth measures RACK_SAMPLE more racks.
+    With wait False the index is neither built nor grown here: a missed band is left
+    to a background thread, such as that of a rounds.RoundQueue started with racks.
+    Raises ValueError if no rack is within the band
     """
+    lexicon = _get_lexicon(lexicon)
+    if not wait and lexicon._rack_index is None:
+        raise ValueError('The rack index is not built yet')
+    rack_index = lexicon.rack_index()
     while True:
-        base_word = random_choice(DICTIONARY)
-        anagrams = find_anagrams(base_word)
-        if len(anagrams) >= at_least:
+        try:
+            chars = rack_index.find(min_words, max_words, min_score, max_score, seed)
             break
-    return base_word, anagrams
+        except ValueError:
+            if len(rack_index) >= max_racks or not lexicon.words:
+                raise
+            if not wait:
+                rack_index.missed.put((min_words, max_words))
+                raise
+            rack_index.grow(min_words, max_words)
+    return chars, [word for word in possible_words(chars, lexicon) if \
+                   len(word) >= rack_index.at_least]
+
+# a ready to play round: mode 1 (Find Anagrams) gives a base word, mode 2 (Construct Words)
+# gives letters, solutions are all accepted answers and lexicon is where they came from
+Round = namedtuple('Round', 'mode given solutions lexicon')
+
+def make_round(mode, lexicon=None):
+    """Accepts a game mode (1 or 2) and returns a new Round with all of its solutions"""
+    lexicon = _get_lexicon(lexicon)
+    if mode == 1:
+        given, solutions = get_anagram_set(2, lexicon=lexicon)
+    elif mode == 2:
+        given, solutions = get_words_set(lexicon=lexicon)
+    else:
+        raise ValueError('Unknown game mode {!r}'.format(mode))
+    return Round(mode, given, tuple(solutions), lexicon)
+
+# outcomes of GameSession.submit
+CORRECT, WRONG, INVALID, REPEAT, BASE, OVER = 'correct', 'wrong', 'invalid', 'repeat', 'base', 'over'
+# how a round of a game session went, reason is why it ended (lives, time, solved or quit)
+# or None while it is running, missed are the solutions that were not found
+SessionResult = namedtuple('SessionResult', 'mode given score answers missed reason')
+
+class GameSession(ABC):
+    """Rules of a game mode's rounds without any input or output, see AnagramSession
+    and ConstructSession\n
+    start begins a round, submit checks a guess, tick counts time down and result tells
+    how the round went. time_limit is in seconds, None for untimed rounds. A session
+    may be started again for a new round. Each mode's subclass implements _check
+    """
+    __slots__ = ('max_lives', 'time_limit', 'lexicon', 'round', 'lives', 'score',
+                 'answers', 'time_left', 'reason')
+    mode = None # game mode of the rounds played
+
+    def __init__(self, lives=LIVES, time_limit=None, lexicon=None):
+        self.max_lives = lives
+        self.time_limit = time_limit
+        self.lexicon = lexicon # where new rounds come from, None for the default LEXICON
+        self.round = None # Round being played
+        self.lives = lives
+        self.score = 0
+        self.answers = set() # correct answers of the round
+        self.time_left = time_limit
+        self.reason = None # why the round ended, None while it is running
+
+    @property
+    def running(self):
+        """True from start until the round ends"""
+        return self.round is not None and self.reason is None
+
+    def start(self, game_round=None):
+        """Begins a round, game_round if given (a Round of this mode) or a new one\n
+        Returns what is given to the player, the base word or the letters
+        """
+        if game_round is None:
+            game_round = make_round(self.mode, self.lexicon)
+        elif game_round.mode != self.mode:
+            raise ValueError('Round of mode {} given to a mode {} session'.format(
+                game_round.mode, self.mode))
+        self.round = game_round
+        self.lives, self.score, self.answers = self.max_lives, 0, set()
+        self.time_left, self.reason = self.time_limit, None
+        self._prepare()
+        return game_round.given
+
+    def _prepare(self):
+        """Not used by itself, precomputes what check needs for the new round"""
+
+    def normalize(self, guess):
+        """Returns guess normalized like the words of the round's lexicon, '' if it
+        can not be one of them
+        """
+        return self.round.lexicon.language.normalize(guess) or ''
+
+    def check(self, guess):
+        """Returns (outcome, points) that submitting guess would give, changes nothing"""
+        return self._check(self.normalize(guess))
+
+    @abstractmethod
+    def _check(self, guess):
+        """Not used by itself, check for an already normalized guess"""
+
+    def submit(self, guess):
+        """Answers the round, returns (outcome, points)\n
+        outcome is CORRECT, WRONG (a life is lost), INVALID, REPEAT, BASE or OVER if
+        the round is not running. The round ends once no lives are left, or once every
+        solution was found if the mode allows it
+        """
+        if self.reason is not None or self.round is None: # not running
+            return OVER, 0
+        guess = self.normalize(guess)
+        outcome, points = self._check(guess)
+        if outcome == CORRECT:
+            self.answers.add(guess)
+            self.score += points
+            if self._solved():
+                self.reason = 'solved'
+        elif outcome == WRONG:
+            self.lives -= 1
+            if not self.lives:
+                self.reason = 'lives'
+        return outcome, points
+
+    def _solved(self):
+        """Not used by itself, True if the round ends because every solution was found"""
+        return False
+
+    def tick(self, seconds=1):
+        """Counts seconds down from a timed round, ending it once no time is left\n
+        Returns running
+        """
+        if self.running and self.time_left is not None:
+            self.time_left -= seconds
+            if self.time_left <= 0:
+                self.time_left, self.reason = 0, 'time'
+        return self.running
+
+    def end(self, reason='quit'):
+        """Ends the round early"""
+        if self.running:
+            self.reason = reason
+
+    def result(self):
+        """Returns the SessionResult of the current (or last) round"""
+        given = self.round.given if self.round is not None else None
+        solutions = self.round.solutions if self.round is not None else ()
+        return SessionResult(self.mode, given, self.score, tuple(sorted(self.answers)),
+                             tuple(word for word in solutions if word not in self.answers),
+                             self.reason)
+
+class AnagramSession(GameSession):
+    """Find Anagrams (mode 1): find the anagrams of the base word, one point each\n
+    The round ends once every anagram is found
+    """
+    __slots__ = ('_signature', '_solutions')
+    mode = 1
+
+    def _prepare(self):
+        self._signature = self.round.lexicon._signature(self.round.given)
+        self._solutions = frozenset(self.round.solutions)
+
+    def _check(self, guess):
+        if not guess or self.round.lexicon._signature(guess) != self._signature:
+            return INVALID, 0
+        if guess in self.answers:
+            return REPEAT, 0
+        if guess in self._solutions:
+            return CORRECT, 1
+        if guess == self.round.given:
+            return BASE, 0
+        return WRONG, 0
+
+    def _solved(self):
+        return len(self.answers) == len(self._solutions)
+
+class ConstructSession(GameSession):
+    """Construct Words (mode 2): make words of at least AT_LEAST letters from the given
+    letters, scoring each word's scrabble score
+    """
+    __slots__ = ('_letters',)
+    mode = 2
+
+    def _prepare(self):
+        self._letters = count_letters(self.round.given)
+
+    def _check(self, guess):
+        lexicon = self.round.lexicon
+        if len(guess) < AT_LEAST or not fits(self._letters, lexicon.letter_counts(guess)):
+            return INVALID, 0
+        if guess in self.answers:
+            return REPEAT, 0
+        if guess in lexicon.word_set:
+            return CORRECT, get_score(guess, lexicon)
+        return WRONG, 0
+
+def new_session(mode, lives=LIVES, time_limit=None, lexicon=None):
+    """Returns a GameSession of a game mode (1 or 2), not started yet"""
+    if mode == 1:
+        return AnagramSession(lives, time_limit, lexicon)
+    if mode == 2:
+        return ConstructSession(lives, time_limit, lexicon)
+    raise ValueError('Unknown game mode {!r}'.format(mode))
+
+class HighScoreStore:
+    """High scores of one save file, the best TOP_SCORES (name, score) entries per mode\n
+    Entries are cached and only read again when the file changes. Writes take a lock
+    file, merge with the latest contents and replace the file atomically, so game
+    processes sharing a save file do not lose each other's scores.
+    Save files in the older format of one name line and one score line per mode
+    are still read, and are rewritten in the newer format on the next write.
+    """
+    def __init__(self, filename, top=TOP_SCORES):
+        self.filename = filename
+        self.top = top
+        self._scores = {} # mode: list of (name, score), highest first
+        self._stamp = None # (inode, mtime_ns, size) of the file when it was read
+        self._lock = threading.Lock()
+
+    def get(self, mode):
+        """Returns the high scores of a mode as a list of (name, score), highest first"""
+        with self._lock:
+            self._refresh()
+            return list(self._scores.get(mode, ()))
+
+    def best(self, mode):
+        """Returns the highest (name, score) of a mode, (None, 0) when there is none"""
+        scores = self.get(mode)
+        return scores[0] if scores else (None, 0)
+
+    def qualifies(self, score, mode):
+        """True if a score would be kept among the best top entries of a mode"""
+        scores = self.get(mode)
+        return score > 0 and (len(scores) < self.top or score > scores[-1][1])
+
+    def add(self, name, score, mode):
+        """Adds a score to a mode, keeping only its best top entries"""
+        with self._lock, _locked_file(self.filename + '.lock'):
+            self._stamp = None # read the latest contents while holding the lock
+            self._refresh()
+            scores = self._scores.setdefault(mode, [])
+            scores.append((str(name), int(score))) # cached as it is written
+            scores.sort(key=lambda entry: entry[1], reverse=True) # stable, older first on ties
+            del scores[self.top:]
+            self._write()
+
+    def _refresh(self):
+        """Not used by itself, reads the file again if it changed since it was read"""
+        try:
+            status = os.stat(self.filename)
+        except FileNotFoundError:
+            self._scores, self._stamp = {}, None
+            return
+        stamp = (status.st_ino, status.st_mtime_ns, status.st_size)
+        if stamp != self._stamp:
+            with open(self.filename, 'r') as save:
+                self._scores = parse_highscores(save.read())
+            self._stamp = stamp
+
+    def _write(self):
+        """Not used by itself, atomically replaces the file with the cached scores"""
+        lines = [HIGHSCORE_HEADER]
+        for mode in sorted(self._scores):
+            for name, score in self._scores[mode]:
+                lines.append('{}\t{}\t{}'.format(mode, score, name))
+        temp_filename = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(temp_filename, 'w') as save:
+            save.write('\n'.join(lines) + '\n')
+        os.replace(temp_filename, self.filename)
+        status = os.stat(self.filename)
+        self._stamp = (status.st_ino, status.st_mtime_ns, status.st_size)
+
+def parse_highscores(contents):
+    """Accepts save file contents and returns a dict of mode: list of (name, score)\n
+    Reads both the multi-entry format and the older one name/score line pair per mode
+    """
+    scores = {}
+    lines = contents.split('\n')
+    if lines[0] == HIGHSCORE_HEADER:
+        for line in lines[1:]:
+            if line:
+                mode, score, name = line.split('\t', 2)
+                scores.setdefault(int(mode), []).append((name, int(score)))
+    else:
+        for mode in range(len(lines)//2):
+            name, score = lines[2*mode], lines[2*mode+1]
+            if score and not (name == 'None' and score == '0'): # unused mode placeholder
+                scores[mode] = [(name, int(score))]
+    for mode_scores in scores.values():
+        mode_scores.sort(key=lambda entry: entry[1], reverse=True)
+    return scores
+
+@contextmanager
+def _locked_file(filename):
+    """Not used by itself, holds an exclusive lock on filename while in the with block"""
+    with open(filename, 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+_HIGHSCORE_STORES = {} # filename: HighScoreStore
+_HIGHSCORE_STORES_LOCK = threading.Lock()
+
+def highscore_store(filename):
+    """Returns the shared HighScoreStore of a save file"""
+    with _HIGHSCORE_STORES_LOCK:
+        if filename not in _HIGHSCORE_STORES:
+            _HIGHSCORE_STORES[filename] = HighScoreStore(filename)
+        return _HIGHSCORE_STORES[filename]
 
 def get_highscore(mode, filename):
     """mode, filename -> get_highscore(mode, filename)\n
     Returns high score from game mode tuple(name, score)
     """
-    try:
-        with open(filename, 'r') as save:
-            contents = save.read().split('\n')
-    except FileNotFoundError:
-        contents = ['0' if i % 2 else 'None' for i in range(mode*2+2)]
-    try:
-        name, score = contents[2*mode], contents[2*mode+1]
-    except IndexError:
-        name, score = None, 0
-    return name, int(score)
+    return highscore_store(filename).best(mode)
+
+def get_highscores(mode, filename):
+    """mode, filename -> get_highscores(mode, filename)\n
+    Returns the best scores of game mode as a list of tuple(name, score), highest first
+    """
+    return highscore_store(filename).get(mode)
+
+def is_highscore(score, row, filename):
+    """score, row, filename -> is_highscore(score, row, filename)\n
+    Returns True if the score would make the TOP_SCORES of game mode row
+    """
+    return highscore_store(filename).qualifies(score, row)
 
 def set_highscore(name, score, row, filename):
     """name, score, row, filename -> set_highscore(name, score, row, filename)\n
-    Sets high score with name in the first sub row in the specified main row and\n
-    score on the second sub row in the specified main row
+    Adds the score with name to the high scores of game mode row,
+    keeping the best TOP_SCORES of them
     """
-    try:
-        with open(filename, 'r') as save:
-            contents = save.read().split('\n')
-    except FileNotFoundError:
-        contents = ['0' if i % 2 else 'None' for i in range(row*2+2)]
+    highscore_store(filename).add(name, score, row)
 
-    while True:
+# public functions timed while instrumentation is enabled
+INSTRUMENTED = ('set_dictionary', 'update_dictionary', 'is_word', 'load_dictionary',
+                'compile_dictionary', 'share_dictionary', 'attach_dictionary', 'get_score',
+                'makeable', 'combine_words', 'possible_words', 'possible_words_batch',
+                'best_words', 'find_anagrams', 'get_anagram_set', 'get_words_set',
+                'generate_rack', 'make_round', 'get_highscore', 'get_highscores',
+                'is_highscore', 'set_highscore')
+INSTRUMENTATION = False # True while the INSTRUMENTED functions are wrapped
+_UNINSTRUMENTED = {} # name: original function, while instrumented
+_CALL_STATS = {} # name: [calls, total seconds, count per LATENCY_BUCKETS bucket...]
+_SCAN_STATS = {} # backend: [scans, words compared]
+_INSTRUMENTATION_LOCK = threading.Lock()
+
+def _instrument(name, function):
+    """Not used by itself, returns function wrapped to record its calls in _CALL_STATS"""
+    @wraps(function)
+    def instrumented(*args, **kwargs):
+        start = perf_counter()
         try:
-            contents[2*row], contents[2*row+1] = name, str(score)
-        except IndexError:
-            contents.extend([None, 0])
-        else:
-            break
+            return function(*args, **kwargs)
+        finally:
+            seconds = perf_counter() - start
+            bucket = bisect_left(LATENCY_BUCKETS, seconds)
+            with _INSTRUMENTATION_LOCK:
+                stats = _CALL_STATS.get(name)
+                if stats is None:
+                    stats = _CALL_STATS[name] = [0, 0.0] + [0]*(len(LATENCY_BUCKETS)+1)
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2 + bucket] += 1
+    return instrumented
+
+def _record_scan(backend, words, racks=1):
+    """Not used by itself, counts a scan of every word of a lexicon by a backend"""
+    with _INSTRUMENTATION_LOCK:
+        stats = _SCAN_STATS.setdefault(backend, [0, 0])
+        stats[0] += racks
+        stats[1] += words * racks
+
+def enable_instrumentation():
+    """Starts recording calls, latencies and dictionary scans of the engine functions\n
+    The INSTRUMENTED module functions are replaced by timed wrappers, so while it is
+    disabled (the default) the engine runs exactly as if it was not there
+    """
+    global INSTRUMENTATION
+    module = sys.modules[__name__]
+    with _INSTRUMENTATION_LOCK:
+        if INSTRUMENTATION:
+            return
+        for name in INSTRUMENTED:
+            _UNINSTRUMENTED[name] = getattr(module, name)
+            setattr(module, name, _instrument(name, _UNINSTRUMENTED[name]))
+        INSTRUMENTATION = True
+
+def disable_instrumentation():
+    """Stops recording and puts back the original engine functions, keeps the records"""
+    global INSTRUMENTATION
+    module = sys.modules[__name__]
+    with _INSTRUMENTATION_LOCK:
+        for name, function in _UNINSTRUMENTED.items():
+            setattr(module, name, function)
+        _UNINSTRUMENTED.clear()
+        INSTRUMENTATION = False
+
+def reset_instrumentation():
+    """Forgets everything recorded so far"""
+    with _INSTRUMENTATION_LOCK:
+        _CALL_STATS.clear()
+        _SCAN_STATS.clear()
+
+def instrumentation_snapshot():
+    """Returns a dict of what was recorded: per function call count, total and mean
+    seconds and latency histogram, per backend dictionary scans and words compared,
+    and the query_cache_stats of the default lexicon
+    """
+    with _INSTRUMENTATION_LOCK:
+        calls = {name: list(stats) for name, stats in _CALL_STATS.items()}
+        scans = {backend: list(stats) for backend, stats in _SCAN_STATS.items()}
+    bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+    return {'enabled': INSTRUMENTATION,
+            'functions': {name: {'calls': stats[0], 'seconds': stats[1],
+                                 'mean_seconds': stats[1]/stats[0],
+                                 'histogram': dict(zip(bounds, stats[2:]))} for \
+                          name, stats in sorted(calls.items())},
+            'scans': {backend: {'scans': stats[0], 'words': stats[1]} for \
+                      backend, stats in sorted(scans.items())},
+            'query_cache': query_cache_stats()}
+
+def export_instrumentation(text_format='json'):
+    """Returns instrumentation_snapshot as JSON, or as Prometheus text exposition
+    format if text_format is 'prometheus'
+    """
+    snapshot = instrumentation_snapshot()
+    if text_format == 'json':
+        return json.dumps(snapshot, indent=2)
+    if text_format != 'prometheus':
+        raise ValueError('Unknown instrumentation format {!r}'.format(text_format))
+    lines = ['# TYPE wordgame_engine_call_seconds histogram']
+    for name, stats in snapshot['functions'].items():
+        cumulative = 0
+        for bound, count in stats['histogram'].items():
+            cumulative += count
+            lines.append('wordgame_engine_call_seconds_bucket{{function="{}",le="{}"}} {}'
+                         .format(name, bound, cumulative))
+        lines.append('wordgame_engine_call_seconds_sum{{function="{}"}} {}'
+                     .format(name, stats['seconds']))
+        lines.append('wordgame_engine_call_seconds_count{{function="{}"}} {}'
+                     .format(name, stats['calls']))
+    lines.append('# TYPE wordgame_engine_scans_total counter')
+    for backend, stats in snapshot['scans'].items():
+        lines.append('wordgame_engine_scans_total{{backend="{}"}} {}'
+                     .format(backend, stats['scans']))
+    lines.append('# TYPE wordgame_engine_scanned_words_total counter')
+    for backend, stats in snapshot['scans'].items():
+        lines.append('wordgame_engine_scanned_words_total{{backend="{}"}} {}'
+                     .format(backend, stats['words']))
+    lines.append('# TYPE wordgame_engine_query_cache_total counter')
+    for result in ('hits', 'misses', 'evictions'):
+        lines.append('wordgame_engine_query_cache_total{{result="{}"}} {}'
+                     .format(result, snapshot['query_cache'][result]))
+    return '\n'.join(lines) + '\n'
+
+def dump_instrumentation(filename=None):
+    """Writes the instrumentation snapshot if instrumentation is enabled\n
+    Writes to filename, or the file named by WORDGAME_INSTRUMENT_FILE, or stderr.
+    Files ending with .prom get Prometheus text, everything else gets JSON
+    """
+    if not INSTRUMENTATION:
+        return
+    filename = filename or os.environ.get(INSTRUMENT_FILE_ENV)
+    text = export_instrumentation('prometheus' if filename and \
+                                  filename.endswith('.prom') else 'json')
+    if filename:
+        with open(filename, 'w') as output:
+            output.write(text)
+    else:
+        sys.stderr.write(text + '\n')
 
-    contents = '\n'.join(contents)
-    with open(filename, 'w') as save:
-        save.write(contents)
+if os.environ.get(INSTRUMENT_ENV):
+    enable_instrumentation()
 
 def main():
+    if len(sys.argv) > 1: # compile the dictionaries given as arguments
+        for filename in sys.argv[1:]:
+            print('Compiled {} into {}'.format(filename, compile_dictionary(filename)))
+        return
     print("This is a module used by 'Word Game!' game.")
     print('It contains all of its game logic')
     input('Press anything to continue...')
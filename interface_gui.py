@@ -5,13 +5,14 @@ Word Game!\n
 Contains main game with GUI
 """
 # built-ins
+from collections import OrderedDict
 from string import ascii_letters, digits, punctuation
-from random import choices as random_choices
 from textwrap import wrap as wrap_text
 # third-party
 import pygame
-# own module
+# own modules
 import engine
+import rounds
 
 # constants
 WIDTH = 1024
@@ -23,7 +24,11 @@ COLOR_FONT_BG = (19, 34, 38) # near black
 COLOR_ACCENT = (49, 172, 171) # light green-blue
 COLOR_FONT = (242, 234, 237) # near white
 LIVES = 3
+MAX_FPS = 30 # most loop iterations (and redraws) per second
+FONT_NAME = 'Helvetica'
+TEXT_CACHE_SIZE = 256 # rendered text surfaces kept by render_text
 SAVE_FILENAME = '.save_gui'
+ROUNDS = rounds.RoundQueue(word_graph=True) # rounds and the word graph made ahead of time
 
 # initialize pygame
 pygame.init()
@@ -31,97 +36,152 @@ pygame.display.set_caption('Word Game!')
 SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
 SCREEN.fill(COLOR_BACKGROUND)
 FONT_SIZE = 36
-FONT_1 = pygame.font.SysFont('Helvetica', FONT_SIZE)
+FONTS = {} # (font name, size): loaded font, see get_font
+TEXT_CACHE = OrderedDict() # (text, font name, size, color): surface, least recent first
+TEXT_CACHE_STATS = {'hits': 0, 'misses': 0, 'evictions': 0}
+CLOCK = pygame.time.Clock()
+
+def get_font(size, name=FONT_NAME):
+    """Returns the font of name and size, loading each system font only once"""
+    font = FONTS.get((name, size))
+    if font is None:
+        font = FONTS[(name, size)] = pygame.font.SysFont(name, size)
+    return font
+
+def render_text(text, size, color, name=FONT_NAME):
+    """Returns text rendered (antialiased) with get_font(size, name) in color\n
+    The last TEXT_CACHE_SIZE rendered surfaces are kept and reused, so unchanged text
+    is not rendered again. Counts are kept in TEXT_CACHE_STATS
+    """
+    key = (text, name, size, color)
+    surface = TEXT_CACHE.get(key)
+    if surface is not None:
+        TEXT_CACHE.move_to_end(key)
+        TEXT_CACHE_STATS['hits'] += 1
+        return surface
+    TEXT_CACHE_STATS['misses'] += 1
+    surface = TEXT_CACHE[key] = get_font(size, name).render(text, True, color)
+    if len(TEXT_CACHE) > TEXT_CACHE_SIZE:
+        TEXT_CACHE.popitem(last=False)
+        TEXT_CACHE_STATS['evictions'] += 1
+    return surface
+
+FONT_1 = get_font(FONT_SIZE)
 FONT_1_HEIGHT = FONT_1.size('')[1]
 
+def wait_events():
+    """Blocks until an event arrives and returns it with every other pending event\n
+    Loops calling this sleep while idle instead of polling, and run at most
+    MAX_FPS times per second. Timer events still wake them up every tick.
+    """
+    CLOCK.tick(MAX_FPS)
+    return [pygame.event.wait()] + pygame.event.get()
+
+def refresh(rects):
+    """Updates only the screen areas in rects (as returned by the drawing functions)
+    instead of the whole screen, then empties rects
+    """
+    pygame.display.update(rects)
+    rects.clear()
+
 def clear_game_area(bgcolor=COLOR_BACKGROUND):
-    """clears game area"""
-    pygame.draw.rect(SCREEN, bgcolor,\
+    """clears game area, returns the rect drawn"""
+    return pygame.draw.rect(SCREEN, bgcolor,\
         (15, 30+FONT_1_HEIGHT, WIDTH-30, HEIGHT-(60+2*FONT_1_HEIGHT)))
 
 def showstatus(phrase, mode=0):
     """str(phrase), int(mode) --> showstatus(phrase, mode=0)
-    Shows phrase on GUI header(mode=0)[default] or footer(mode=1)
+    Shows phrase on GUI header(mode=0)[default] or footer(mode=1), returns the rect drawn
     """
     phrase = str(phrase)
-    textdisp = FONT_1.render(phrase, True, COLOR_FONT)
+    textdisp = render_text(phrase, FONT_SIZE, COLOR_FONT)
     # position based on mode
     if mode == 0:
         position = (15, 15)
     elif mode == 1:
         position = (15, HEIGHT-(FONT_1_HEIGHT+15))
     # draw to screen
-    pygame.draw.rect(SCREEN, COLOR_FONT_BG, position + (WIDTH-30, FONT_1_HEIGHT))
-    SCREEN.blit(textdisp, (position[0]+6, position[1]))
+    rect = pygame.draw.rect(SCREEN, COLOR_FONT_BG, position + (WIDTH-30, FONT_1_HEIGHT))
+    return rect.union(SCREEN.blit(textdisp, (position[0]+6, position[1])))
 
-def show_line(phrase, height):
-    """Shows a line in screen in height specified"""
-    display_text = FONT_1.render(phrase, True, COLOR_FONT)
-    text_size = FONT_1.size(phrase)
+def show_line(phrase, height, color=COLOR_FONT):
+    """Shows a line in screen in height specified, returns the rect drawn"""
+    display_text = render_text(phrase, FONT_SIZE, color)
+    text_size = display_text.get_size()
     position = ((WIDTH-text_size[0])//2, height)
-    pygame.draw.rect(SCREEN, COLOR_FONT_BG,\
-                     (15, position[1]) + (WIDTH-30, text_size[1]))
-    SCREEN.blit(display_text, position)
+    rect = pygame.draw.rect(SCREEN, COLOR_FONT_BG,\
+                            (15, position[1]) + (WIDTH-30, text_size[1]))
+    return rect.union(SCREEN.blit(display_text, position))
+
+def typed_color(cursor):
+    """Returns the color of a typed answer from its engine.PrefixCursor: COLOR_ACCENT
+    if it is a word, COLOR_FONT if it may still become one, else COLOR_BACKGROUND
+    """
+    if cursor.complete:
+        return COLOR_ACCENT
+    return COLOR_FONT if cursor.viable else COLOR_BACKGROUND
 
 def show_answers(answer_list):
-    """Shows answers in the GUI"""
+    """Shows answers in the GUI, returns the rect drawn"""
     answers = ' | '.join(answer_list)
     answers = wrap_text(answers, 81)
-    answer_font = pygame.font.SysFont('Helvetica', FONT_SIZE-4)
-    answer_font_height = answer_font.size('')[1]
+    answer_font_height = get_font(FONT_SIZE-4).size('')[1]
     height = 15 + 66 + 3*FONT_1_HEIGHT
+    rect = pygame.Rect(30, height, 0, 0)
     for answer in answers:
-        display_text = answer_font.render(answer, True, COLOR_FONT)
-        text_size = answer_font.size(answer)
+        display_text = render_text(answer, FONT_SIZE-4, COLOR_FONT)
+        text_size = display_text.get_size()
         position = (30, height)
-        pygame.draw.rect(SCREEN, COLOR_FONT_BG, position + text_size)
-        SCREEN.blit(display_text, position)
+        rect.union_ip(pygame.draw.rect(SCREEN, COLOR_FONT_BG, position + text_size))
+        rect.union_ip(SCREEN.blit(display_text, position))
         height += answer_font_height + 6
+    return rect
 
 def update_lives(lives):
-    """Updates lives GUI"""
-    font = pygame.font.SysFont('Helvetica', FONT_SIZE + 34)
+    """Updates lives GUI, returns the rect drawn"""
+    font = get_font(FONT_SIZE + 34)
     lives = lives*chr(9829)
-    display_text = font.render(lives, True, COLOR_BACKGROUND)
+    display_text = render_text(lives, FONT_SIZE + 34, COLOR_BACKGROUND)
     text_size = font.size(lives + chr(9829))
     position = (30, FONT_1_HEIGHT + 48)
-    pygame.draw.rect(SCREEN, COLOR_ACCENT, (position[0]-6, \
-                     position[1]-6) + (text_size[0] + 12, text_size[1]+12))
-    SCREEN.blit(display_text, (position[0], position[1]-25))
+    rect = pygame.draw.rect(SCREEN, COLOR_ACCENT, (position[0]-6, \
+                            position[1]-6) + (text_size[0] + 12, text_size[1]+12))
+    return rect.union(SCREEN.blit(display_text, (position[0], position[1]-25)))
 
 def update_time(msec):
-    """Updates time GUI"""
+    """Updates time GUI, returns the rect drawn"""
     msec = 'Time left: ' + str(msec) + ' s'
-    display_text = FONT_1.render(msec, True, COLOR_FONT_BG)
-    text_size = FONT_1.size(msec)
+    display_text = render_text(msec, FONT_SIZE, COLOR_FONT_BG)
+    text_size = display_text.get_size()
     position = ((WIDTH-text_size[0])//2, FONT_1_HEIGHT + 48)
-    pygame.draw.rect(SCREEN, COLOR_ACCENT, (position[0]-6, \
-                     position[1]-6) + (text_size[0] + 12, text_size[1]+12))
-    SCREEN.blit(display_text, position)
+    rect = pygame.draw.rect(SCREEN, COLOR_ACCENT, (position[0]-6, \
+                            position[1]-6) + (text_size[0] + 12, text_size[1]+12))
+    return rect.union(SCREEN.blit(display_text, position))
 
 def update_score(score):
-    """Updates score GUI"""
+    """Updates score GUI, returns the rect drawn"""
     score = 'Score: ' + str(score)
-    display_text = FONT_1.render(score, True, COLOR_FONT_BG)
-    text_size = FONT_1.size(score)
+    display_text = render_text(score, FONT_SIZE, COLOR_FONT_BG)
+    text_size = display_text.get_size()
     position = (WIDTH - text_size[0] - 30, FONT_1_HEIGHT + 48)
-    pygame.draw.rect(SCREEN, COLOR_ACCENT, (position[0]-6, \
-                     position[1]-6) + (text_size[0] + 12, text_size[1]+12))
-    SCREEN.blit(display_text, position)
+    rect = pygame.draw.rect(SCREEN, COLOR_ACCENT, (position[0]-6, \
+                            position[1]-6) + (text_size[0] + 12, text_size[1]+12))
+    return rect.union(SCREEN.blit(display_text, position))
 
 def get_strinput(max_chars=-1):
     """Gets long user input and returns it as string"""
     holder = []
+    dirty = [] # screen areas drawn since the last refresh
     # main loop
     getting_strinput = True
     while getting_strinput:
         # get keypresses
-        for event in pygame.event.get():
+        for event in wait_events():
             if event.type == pygame.KEYDOWN:
                 if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                     # done case: clear bottom status then return string
-                    showstatus('', 1)
-                    pygame.display.flip()
+                    dirty.append(showstatus('', 1))
+                    refresh(dirty)
                     return ''.join(holder)
                 elif event.key == pygame.K_BACKSPACE:
                     if holder:
@@ -134,14 +194,13 @@ def get_strinput(max_chars=-1):
                     return None # quit game
 
                 # update/show input at bottom.
-                showstatus(''.join(holder), 1)
-                pygame.display.flip()
+                dirty.append(showstatus(''.join(holder), 1))
+                refresh(dirty)
 
 def select_dictionary():
     """GUI dictionary selection"""
-    showstatus('Enter dictionary filename! (or press enter to use default)')
-    showstatus('', 1)
-    pygame.display.flip()
+    refresh([showstatus('Enter dictionary filename! (or press enter to use default)'),
+             showstatus('', 1)])
     while True:
         user_input = get_strinput()
         if user_input == '':
@@ -150,13 +209,13 @@ def select_dictionary():
             pygame.quit()
             return
         try:
-            engine.set_dictionary(tuple(engine.open_dictionary(user_input)))
+            engine.set_dictionary(engine.load_dictionary(user_input))
         except FileNotFoundError:
-            showstatus('File not found!')
-            pygame.display.flip()
+            refresh([showstatus('File not found!')])
         except TypeError:
             return
         else:
+            ROUNDS.flush() # queued rounds belong to the previous dictionary
             break
 
 def menu(*menu_names):
@@ -179,6 +238,7 @@ def menu(*menu_names):
     # keying color
     menu_surface.fill((1, 1, 1))
     menu_surface.set_colorkey((1, 1, 1))
+    menu_position = ((WIDTH-menu_width)//2, (HEIGHT-menu_heigth)//2)
     # initial draw for buttons and button names
     for row_index, row_names in enumerate(menu_names):
         for col_index, button_name in enumerate(row_names):
@@ -189,14 +249,14 @@ def menu(*menu_names):
                           button_width, button_height)
             menu_button(button_name, True if row_index == 0 and col_index == 0 else False, \
                         dimensions, menu_surface)
-    SCREEN.blit(menu_surface, ((WIDTH-menu_width)/2, (HEIGHT-menu_heigth)/2))
-    pygame.display.flip()
+    refresh([SCREEN.blit(menu_surface, menu_position)])
 
     # menu loop
     selected = [0, 0]
     new_selected = [0, 0]
+    dirty = [] # screen areas drawn since the last refresh
     while True:
-        for event in pygame.event.get():
+        for event in wait_events():
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
                     new_selected[0] = (selected[0] - 1) % rows
@@ -221,19 +281,19 @@ def menu(*menu_names):
                                    else (menu_width - gap*(len(cols)-1))//len(cols)
                     dimensions = ((button_width+gap)*selected[1], height_list[selected[0]], \
                                   button_width, button_height)
-                    menu_button(cols[selected[1]], False,\
-                                dimensions, menu_surface)
+                    dirty.append(menu_button(cols[selected[1]], False,\
+                                             dimensions, menu_surface).move(menu_position))
                     # redraw new selected button to selected state
                     cols = menu_names[new_selected[0]]
                     button_width = menu_width if len(cols) == 1\
                                    else (menu_width - gap*(len(cols)-1))//len(cols)
                     dimensions = ((button_width+gap)*new_selected[1], height_list[new_selected[0]],\
                                   button_width, button_height)
-                    menu_button(cols[new_selected[1]], True,\
-                                dimensions, menu_surface)
-                    SCREEN.blit(menu_surface, ((WIDTH-menu_width)//2, (HEIGHT-menu_heigth)//2))
+                    dirty.append(menu_button(cols[new_selected[1]], True,\
+                                             dimensions, menu_surface).move(menu_position))
+                    SCREEN.blit(menu_surface, menu_position)
                     selected = new_selected.copy()
-                pygame.display.flip()
+                refresh(dirty)
 
 def menu_button(name, mode, rect, msurface):
     """Not used by itself, helper function for menu function
@@ -241,49 +301,59 @@ def menu_button(name, mode, rect, msurface):
     mode = highlighted if True, normal if False (default)
     rect = button position and dimensions
     msurface = surface where the button will be drawn
+    returns the rect drawn on msurface
     """
-    pygame.draw.rect(msurface, COLOR_FONT if mode else COLOR_FONT_BG, rect)
-    text = FONT_1.render(name, True, COLOR_FONT if not mode else COLOR_FONT_BG)
-    size = FONT_1.size(name)
-    msurface.blit(text, (rect[0] + (rect[2]-size[0])//2, rect[1] + (rect[3]-size[1])//2))
+    drawn = pygame.draw.rect(msurface, COLOR_FONT if mode else COLOR_FONT_BG, rect)
+    text = render_text(name, FONT_SIZE, COLOR_FONT if not mode else COLOR_FONT_BG)
+    size = text.get_size()
+    return drawn.union(msurface.blit(text, (rect[0] + (rect[2]-size[0])//2,
+                                            rect[1] + (rect[3]-size[1])//2)))
 
 def game1(time_limit):
     """"Anagram game: Find all anagrams of a random word\n
     before running out of lives or time. Score is computed by getting\n
     the number of correct anagrams found.
     """
-    showstatus('Find all the possible anagrams!')
+    dirty = [] # screen areas drawn since the last refresh
+    dirty.append(showstatus('Find all the possible anagrams!'))
     # variables
-    lives = LIVES
-    score = 0
-    base_anagram, anagrams = engine.get_anagram_set(2) # get given and answers
-    total_score = len(anagrams) # get highest score attainable
-    answers = [] # list of correct answers found
+    session = engine.AnagramSession(LIVES, time_limit if time_limit > 0 else None)
+    try:
+        base_anagram = session.start(ROUNDS.get(1)) # get given and answers
+    except ValueError: # no anagram class is big enough
+        dirty.append(showstatus('This dictionary has no anagram sets!'))
+        dirty.append(showstatus('You got 0 points! (press enter to continue)', 1))
+        refresh(dirty)
+        while True:
+            for event in wait_events():
+                if event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+                        return
     letter_bank = [str(letter) for letter in base_anagram] # available letters to be used
     holder = [] # letters used
     typing = True
     # initial draw
-    update_score(score)
-    update_lives(lives)
-    show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT) # draws given
-    show_line('', HEIGHT - (2*FONT_1_HEIGHT + 45)) # draws currently typing answer
+    dirty.append(update_score(session.score))
+    dirty.append(update_lives(session.lives))
+    dirty.append(show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT)) # draws given
+    # draws currently typing answer
+    dirty.append(show_line('', HEIGHT - (2*FONT_1_HEIGHT + 45)))
     # initialize timer event
-    sec = time_limit
     if time_limit > 0:
         pygame.time.set_timer(pygame.USEREVENT, 1000)
-        update_time(sec)
-    pygame.display.flip()
-    # main game loop
-    while lives and score != total_score and sec != 0:
+        dirty.append(update_time(session.time_left))
+    refresh(dirty)
+    # main game loop, until out of lives or time or every anagram is found
+    while session.running:
         if typing:
-            for event in pygame.event.get():
+            for event in wait_events():
                 if event.type == pygame.USEREVENT: # clock tick
-                    sec -= 1
-                    update_time(sec)
+                    session.tick(1)
+                    dirty.append(update_time(session.time_left))
                 elif event.type == pygame.KEYDOWN:
                     if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                         if letter_bank:
-                            showstatus('Use all the letters!')
+                            dirty.append(showstatus('Use all the letters!'))
                         else: # exit from typing
                             typing = False
                     elif event.key == pygame.K_BACKSPACE:
@@ -296,54 +366,46 @@ def game1(time_limit):
                         letter_bank.remove(letter)
                     elif event.type == pygame.QUIT or \
                          (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-                        lives = 0
+                        session.end()
 
-                    show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT) # draws given
+                    # draws given
+                    dirty.append(show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT))
                     # draws currently typing answer
-                    show_line(' '.join(holder), HEIGHT - (2*FONT_1_HEIGHT + 45))
+                    dirty.append(show_line(' '.join(holder), HEIGHT - (2*FONT_1_HEIGHT + 45)))
         else: # if not typing
-            answer = ''.join(holder)
-            if answer in anagrams: # if correct
-                score += 1
-                anagrams.remove(answer)
-                answers.append(answer)
-                show_answers(answers)
-                update_score(score)
-                showstatus('Correct!')
-            elif answer == base_anagram: # if answered the given word
-                showstatus("That's the original word!")
-            elif answer in answers:
-                showstatus("Already answered!")
-            else: # if wrong
-                lives -= 1
-                update_lives(lives)
-                showstatus('Not in dictionary!')
+            outcome, _ = session.submit(''.join(holder))
+            if outcome == engine.CORRECT:
+                dirty.append(show_answers(sorted(session.answers)))
+                dirty.append(update_score(session.score))
+                dirty.append(showstatus('Correct!'))
+            elif outcome == engine.BASE: # if answered the given word
+                dirty.append(showstatus("That's the original word!"))
+            elif outcome == engine.REPEAT:
+                dirty.append(showstatus("Already answered!"))
+            elif outcome == engine.WRONG:
+                dirty.append(update_lives(session.lives))
+                dirty.append(showstatus('Not in dictionary!'))
             # reinitialize
             typing = True
             holder = []
             letter_bank = [str(letter) for letter in base_anagram]
-            show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT)
-            show_line('', HEIGHT - (2*FONT_1_HEIGHT + 45))
-        pygame.display.flip()
+            dirty.append(show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT))
+            dirty.append(show_line('', HEIGHT - (2*FONT_1_HEIGHT + 45)))
+        refresh(dirty)
     # game conclusion
-    show_answers(answers + ['-='*40+'-', 'Other answers:'] + anagrams) # show answers/other answers
+    result = session.result()
+    score = result.score
+    # show answers/other answers
+    answers = list(result.answers) + ['-='*40+'-', 'Other answers:'] + list(result.missed)
+    dirty.append(show_answers(answers))
     pygame.time.set_timer(pygame.USEREVENT, 0) # stops timer event
     # high score handling
-    hname, hscore = engine.get_highscore(1 if time_limit == -1 else 0, SAVE_FILENAME)
-    if score > hscore:
-        showstatus('You got {} points!'.format(score))
-        showstatus('Enter your name: ', 1)
-        pygame.display.flip()
-        name = get_strinput(9)
-        showstatus('New highscore is {} points!'.format(score), 1)
-        engine.set_highscore(name, score, 1 if time_limit == -1 else 0, SAVE_FILENAME)
-    else:
-        showstatus('The highscore is {} by {}'.format(hscore, hname), 1)
+    highscore_handling(score, 1 if time_limit == -1 else 0, answers, dirty)
     # wait for enter before exit
-    showstatus('You got {} points! (press enter to continue)'.format(score))
-    pygame.display.flip()
+    dirty.append(showstatus('You got {} points! (press enter to continue)'.format(score)))
+    refresh(dirty)
     while True:
-        for event in pygame.event.get():
+        for event in wait_events():
             if event.type == pygame.KEYDOWN:
                 if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                     return
@@ -353,113 +415,130 @@ def game2(time_limit):
     before running out of lives or time. Score is computed by getting\n
     the scrabble points of each correct answer.
     """
-    showstatus('Form words using these letters!')
+    dirty = [] # screen areas drawn since the last refresh
+    dirty.append(showstatus('Form words using these letters!'))
     # variables
-    lives = LIVES
-    score = 0
-    base_chars = engine.combine_words(random_choices(engine.DICTIONARY, k=2)) # given
-    at_least = 3 # minimum letters to be considered a word
-    answers = [] # correct answers made
+    session = engine.ConstructSession(LIVES, time_limit if time_limit > 0 else None)
+    base_chars = session.start(ROUNDS.get(2)) # given
+    at_least = engine.AT_LEAST # minimum letters to be considered a word
     letter_bank = [str(letter) for letter in base_chars] # letters available to be used
     holder = [] # letters used
+    cursor = engine.prefix_cursor(session.round.lexicon) # follows holder as it is typed
     typing = True
     # initial draw
-    update_score(score)
-    update_lives(lives)
-    show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT) # draws given
-    show_line('', HEIGHT - (2*FONT_1_HEIGHT + 45)) # draws currently typing answer
+    dirty.append(update_score(session.score))
+    dirty.append(update_lives(session.lives))
+    dirty.append(show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT)) # draws given
+    # draws currently typing answer
+    dirty.append(show_line('', HEIGHT - (2*FONT_1_HEIGHT + 45)))
     # initialize timer event
-    sec = time_limit
     if time_limit > 0:
         pygame.time.set_timer(pygame.USEREVENT, 1000)
-        update_time(sec)
-    pygame.display.flip()
+        dirty.append(update_time(session.time_left))
+    refresh(dirty)
     # main game loop
-    while lives and sec != 0:
+    while session.running:
         if typing:
-            for event in pygame.event.get():
+            for event in wait_events():
                 if event.type == pygame.USEREVENT: # clock tick
-                    sec -= 1
-                    update_time(sec)
+                    session.tick(1)
+                    dirty.append(update_time(session.time_left))
                 elif event.type == pygame.KEYDOWN:
                     if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                         if len(holder) >= at_least: # exit from typing
                             typing = False
                         else:
-                            showstatus('Enter at least {} letters!'.format(at_least))
+                            dirty.append(showstatus('Enter at least {} letters!'.format(at_least)))
                     elif event.key == pygame.K_BACKSPACE:
                         if holder:
                             letter_bank.append(holder[-1])
                             holder = holder[:-1]
+                            cursor.pop()
                     elif event.unicode.lower() in letter_bank:
                         letter = event.unicode.lower()
                         holder.append(letter)
                         letter_bank.remove(letter)
+                        cursor.push(letter)
                     elif event.type == pygame.QUIT or \
                          (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-                        lives = 0
+                        session.end()
 
-                    show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT) # draws given
-                    # draws currently typing answer
-                    show_line(' '.join(holder), HEIGHT - (2*FONT_1_HEIGHT + 45))
+                    # draws given
+                    dirty.append(show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT))
+                    # draws currently typing answer, colored by where the prefix leads
+                    dirty.append(show_line(' '.join(holder), HEIGHT - (2*FONT_1_HEIGHT + 45),
+                                           typed_color(cursor)))
         else: # if not typing
-            answer = ''.join(holder)
-            if answer in engine.DICTIONARY: # if correct
-                if answer not in answers: # if not yet answered before
-                    score += engine.get_score(answer)
-                    answers.append(answer)
-                    show_answers(answers)
-                    update_score(score)
-                    showstatus('Correct!')
-                else: # if already answered
-                    showstatus('Already answered!')
-            else: # if not in dictionary
-                lives -= 1
-                update_lives(lives)
-                showstatus('Not in dictionary!')
+            outcome, _ = session.submit(''.join(holder))
+            if outcome == engine.CORRECT:
+                dirty.append(show_answers(sorted(session.answers)))
+                dirty.append(update_score(session.score))
+                dirty.append(showstatus('Correct!'))
+            elif outcome == engine.REPEAT: # if already answered
+                dirty.append(showstatus('Already answered!'))
+            elif outcome == engine.WRONG: # if not in dictionary
+                dirty.append(update_lives(session.lives))
+                dirty.append(showstatus('Not in dictionary!'))
             # reinitialize
             typing = True
             holder = []
+            cursor.reset()
             letter_bank = [str(letter) for letter in base_chars]
-            show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT)
-            show_line(' '.join(holder), HEIGHT - (2*FONT_1_HEIGHT + 45))
-        pygame.display.flip()
+            dirty.append(show_line(' '.join(letter_bank), 66 + 2*FONT_1_HEIGHT))
+            dirty.append(show_line(' '.join(holder), HEIGHT - (2*FONT_1_HEIGHT + 45)))
+        refresh(dirty)
     # game conclusion
+    score = session.score
     pygame.time.set_timer(pygame.USEREVENT, 0) # stops timer event
     # high score handling
-    hname, hscore = engine.get_highscore(3 if time_limit == -1 else 2, SAVE_FILENAME)
-    if score > hscore:
-        showstatus('You got {} points!'.format(score))
-        showstatus('Enter your name: ', 1)
-        pygame.display.flip()
-        name = get_strinput(9)
-        showstatus('New highscore is {} points!'.format(score), 1)
-        engine.set_highscore(name, score, 3 if time_limit == -1 else 2, SAVE_FILENAME)
-    else:
-        showstatus('The highscore is {} by {}'.format(hscore, hname), 1)
+    highscore_handling(score, 3 if time_limit == -1 else 2, sorted(session.answers), dirty)
     # wait for enter before exit
-    showstatus('You got {} points! (press enter to continue)'.format(score))
-    pygame.display.flip()
+    dirty.append(showstatus('You got {} points! (press enter to continue)'.format(score)))
+    refresh(dirty)
     while True:
-        for event in pygame.event.get():
+        for event in wait_events():
             if event.type == pygame.KEYDOWN:
                 if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                     return
 
+def highscore_handling(score, row, answers, dirty):
+    """Records score in the high scores of game mode row when it makes the TOP_SCORES,
+    asking for a name, then shows them after answers\n
+    dirty holds the caller's rects not refreshed yet, the rects drawn are added to it
+    and all of them are refreshed before waiting for the name
+    """
+    hname, hscore = engine.get_highscore(row, SAVE_FILENAME)
+    if engine.is_highscore(score, row, SAVE_FILENAME):
+        dirty.append(showstatus('You got {} points!'.format(score)))
+        dirty.append(showstatus('Enter your name: ', 1))
+        refresh(dirty)
+        name = get_strinput(9)
+        if score > hscore:
+            dirty.append(showstatus('New highscore is {} points!'.format(score), 1))
+        else:
+            dirty.append(showstatus('You made the high scores with {} points!'.format(score), 1))
+        engine.set_highscore(name, score, row, SAVE_FILENAME)
+    else:
+        dirty.append(showstatus('The highscore is {} by {}'.format(hscore, hname), 1))
+    highscores = ['{}. {} {}'.format(place, name, points) for place, (name, points) in \
+                  enumerate(engine.get_highscores(row, SAVE_FILENAME), 1)]
+    dirty.append(show_answers(answers + ['-='*40+'-', 'High scores:'] + highscores))
+
 def run():
     """Main function to run the game\n
     Shows the structure of the whole game
     """
     # initialize constant
     time_limit = TIME_LIMIT_SET
+    pygame.display.flip() # the only full screen update, later ones are only what changed
 
     # select dictionary
     select_dictionary()
+    ROUNDS.start()
 
     # main loop
     while True:
-        clear_game_area()
-        showstatus('Menu: Select a game mode.')
+        dirty = [clear_game_area(), showstatus('Menu: Select a game mode.')]
         # show highscore of game mode (timed or untimed)
         if time_limit != -1:
             scores = engine.get_highscore(0, SAVE_FILENAME) + engine.get_highscore(2, SAVE_FILENAME)
@@ -467,10 +546,10 @@ def run():
         else:
             scores = engine.get_highscore(1, SAVE_FILENAME) + engine.get_highscore(3, SAVE_FILENAME)
             time_mode = 'Untimed'
-        showstatus('{0} | Anagrams: {1} with {2} {5} - Words: {3} with {4} {6}'.format(\
-                   time_mode, *scores, 'pts' if scores[1] > 1 else 'pt',               \
-                   'pts' if scores[3] > 1 else 'pt'), 1)
-        pygame.display.flip()
+        dirty.append(showstatus('{0} | Anagrams: {1} with {2} {5} - Words: {3} with {4} {6}'\
+                                .format(time_mode, *scores, 'pts' if scores[1] > 1 else 'pt',
+                                        'pts' if scores[3] > 1 else 'pt'), 1))
+        refresh(dirty)
 
         # get user input from menu
         main_menu, sub_menu =                                                          \
@@ -481,10 +560,10 @@ def run():
         if main_menu == 4 or main_menu == -1:
             break # exit case
         elif main_menu == 0:
-            clear_game_area(COLOR_ACCENT)
+            refresh([clear_game_area(COLOR_ACCENT)])
             game1(time_limit) # anagram game
         elif main_menu == 1:
-            clear_game_area(COLOR_ACCENT)
+            refresh([clear_game_area(COLOR_ACCENT)])
             game2(time_limit) # words game
         elif main_menu == 2:
             # time limit setting
@@ -496,6 +575,8 @@ def run():
             select_dictionary()
 
     # free resources
+    ROUNDS.stop()
+    engine.dump_instrumentation() # only if instrumentation was enabled
     pygame.quit()
 
 if __name__ == '__main__':
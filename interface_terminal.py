@@ -4,13 +4,14 @@
 Word Game!\n
 Contains main game interface
 """
-from random import choices as random_choices
 import engine
+import rounds
 
 # constants
 SET_LIVES = 3
 SAVE_FILENAME = '.save_terminal'
 MODES = ['Find Anagrams!', 'Construct Words!', 'Change Dictionary']
+ROUNDS = rounds.RoundQueue() # rounds generated ahead of time
 
 def select_dictionary():
     """Terminal dictionary selection"""
@@ -19,10 +20,11 @@ def select_dictionary():
         if not dictionary_fname:
             dictionary_fname = 'dictionary.txt'
         try:
-            engine.set_dictionary(engine.open_dictionary(dictionary_fname))
+            engine.set_dictionary(engine.load_dictionary(dictionary_fname))
         except FileNotFoundError:
             print('File not found!')
         else:
+            ROUNDS.flush() # queued rounds belong to the previous dictionary
             break
 
 def game1():
@@ -32,51 +34,38 @@ def game1():
     """
     print('You chose {}'.format(MODES[0]))
 
-    # constants
-    # get base_anagram and its anagrams with at least two answers
-    base_anagram, anagrams = engine.get_anagram_set(2)
-    # get letter count of base_anagram since it will be used often in the loop
-    base_letter_count = engine.count_letters(base_anagram)
-
-    # variables
-    lives = SET_LIVES
-    score = 0
-    right_ans = []
+    # get base_anagram of a round with at least two answers
+    session = engine.AnagramSession(SET_LIVES)
+    try:
+        base_anagram = session.start(ROUNDS.get(1))
+    except ValueError: # no anagram class is big enough
+        print('This dictionary has no anagram sets, choose another one to play.')
+        return 0
 
     print('Find the anagrams of:')
-    # game main loop
-    while lives and anagrams: # while there are remaining lives and answers
+    # game main loop, while there are remaining lives and answers
+    while session.running:
         print('==' + base_anagram + '==')
-        answer = input()
-        if engine.count_letters(answer) == base_letter_count: # checks if answer is valid
-            if answer not in right_ans: # check if answer was already answered
-                if answer in anagrams: # check if it is an anagram
-                    right_ans.append(answer)
-                    anagrams.remove(answer)
-                    score += 1
-                    print('Score {}'.format(score))
-                elif answer == base_anagram:
-                    print('This is the base word.')
-                else:
-                    lives -= 1
-                    print('Not in dictionary! Lives: {}'.format(lives))
-            else:
-                print('Already answered!')
+        outcome, _ = session.submit(input())
+        if outcome == engine.CORRECT:
+            print('Score {}'.format(session.score))
+        elif outcome == engine.BASE:
+            print('This is the base word.')
+        elif outcome == engine.WRONG:
+            print('Not in dictionary! Lives: {}'.format(session.lives))
+        elif outcome == engine.REPEAT:
+            print('Already answered!')
         else:
             print('Not a valid answer!')
     # game1 conclusion
-    if anagrams: # check if there are remaining answers
-        if score: # if player scored at least one, print other answers
-            print('Other answers are: ', end='')
-            for word in anagrams:
-                if word not in right_ans:
-                    print(word, end=' ')
-        else:
-            print('Answers are: ', end='')
-            for word in anagrams:
-                print(word, end=' ')
+    result = session.result()
+    if result.missed: # check if there are remaining answers
+        # if player scored at least one, print other answers
+        print('Other answers are: ' if result.score else 'Answers are: ', end='')
+        for word in result.missed:
+            print(word, end=' ')
         print()
-    return score
+    return result.score
 
 def game2():
     """Game mode 2: Construct Words!: Form words using letters generated\n
@@ -85,40 +74,37 @@ def game2():
     """
     print('You chose {}'.format(MODES[1]))
 
-    # constant
     # get characters that the user may use, created by combining 2 random words
-    chars = engine.combine_words(random_choices(engine.DICTIONARY, k=2))
-
-    # variables
-    lives = SET_LIVES
-    score = 0
-    right_ans = []
+    session = engine.ConstructSession(SET_LIVES)
+    chars = session.start(ROUNDS.get(2))
 
     print('Enter words using these letters:')
     # game main loop
-    while lives:
+    while session.running:
         print('==' + chars + '==')
-        answer = input()
-        # only accept at least 3 letter words and check if valid answer
-        if engine.makeable(chars, answer) and len(answer) >= 3:
-            if answer not in right_ans: # check if answer was already answered
-                if answer in engine.DICTIONARY: # check if answer is correct
-                    right_ans.append(answer)
-                    score += engine.get_score(answer) # get scrabble points
-                    print('Score: {}'.format(score))
-                else:
-                    lives -= 1
-                    print('Not in dictionary! Lives: {}'.format(lives))
-            else:
-                print('Already answered!')
+        # only accepts makeable words of at least engine.AT_LEAST letters
+        outcome, _ = session.submit(input())
+        if outcome == engine.CORRECT:
+            print('Score: {}'.format(session.score))
+        elif outcome == engine.WRONG:
+            print('Not in dictionary! Lives: {}'.format(session.lives))
+        elif outcome == engine.REPEAT:
+            print('Already answered!')
         else:
             print('Invalid answer!')
-    return score
+    return session.score
+
+def show_highscores(row):
+    """Prints the high scores of game mode row, best first"""
+    print('High scores of {}:'.format(MODES[row]))
+    for place, (name, score) in enumerate(engine.get_highscores(row, SAVE_FILENAME), 1):
+        print('{:>2}. {} with {}'.format(place, name, score))
 
 def run():
     """Main function that runs the game"""
     # get dictionary
     select_dictionary()
+    ROUNDS.start()
 
     # main loop
     running = True
@@ -143,13 +129,17 @@ def run():
             # game conclusion
             name, current_high_score = engine.get_highscore(int(mode)-1, SAVE_FILENAME)
             print('='*10)
-            if score > current_high_score:
-                print('New high score! You got {} points!'.format(score))
+            if engine.is_highscore(score, int(mode)-1, SAVE_FILENAME):
+                if score > current_high_score:
+                    print('New high score! You got {} points!'.format(score))
+                else:
+                    print('You made the high scores with {} points!'.format(score))
                 name = input('Enter your name:')
                 engine.set_highscore(name, score, int(mode)-1, SAVE_FILENAME)
             else:
                 print('You got {} points!'.format(score))
                 print('The high score is {} by {}'.format(current_high_score, name))
+            show_highscores(int(mode)-1)
         elif mode == '3':
             select_dictionary()
         elif mode == '0':
@@ -157,6 +147,8 @@ def run():
             running = False
         else:
             print('Invalid!')
+    ROUNDS.stop()
+    engine.dump_instrumentation() # only if instrumentation was enabled
 
 if __name__ == '__main__':
     run()
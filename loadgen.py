@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word Game! load generator\n
+Plays interface_terminal.game1 and game2 with simulated players in parallel processes,
+each bot standing in for stdin and stdout, and reports rounds per second, guess latency
+percentiles and CPU usage while the load runs and once it is done\n
+Bots answer with a mix of correct guesses (found by the engine), repeats, invalid and
+wrong words, or replay the guesses of a script file\n
+Usage: python loadgen.py [--processes N] [--seconds S] [--rate GUESSES] [--mix MIX]
+                         [--script FILE] [--output FILE] [--baseline FILE]
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+from os import cpu_count
+from queue import Empty
+from random import Random
+from time import perf_counter, sleep, thread_time
+import bench
+import engine
+import interface_terminal
+import solver
+
+DICTIONARY_FILENAME = 'tagalog.txt'
+SECONDS = 10.0 # how long the load runs
+INTERVAL = 1.0 # seconds between progress lines
+MAX_GUESSES = 100 # guesses after which a bot abandons its round
+# metric: True if higher is better, compared against a baseline like bench.py does
+TRACKED = {'throughput': True, 'p50_ms': False, 'p99_ms': False, 'cpu_ms_per_round': False}
+# kinds of guesses and how often bots make them
+MIX = {'correct': 0.6, 'repeat': 0.1, 'invalid': 0.1, 'wrong': 0.2}
+GAMES = {1: interface_terminal.game1, 2: interface_terminal.game2}
+
+class Abandoned(Exception):
+    """Raised by a bot's readline to leave a round, the terminal game has no quit"""
+
+class Bot:
+    """Simulated player, used as both sys.stdin and sys.stdout of interface_terminal\n
+    Reads the base word or letters from what the game prints and answers every input()
+    with a guess. Records how long the game took to handle each guess (from returning
+    the guess until the next input() or the end of the round) and how long each round
+    took to start (from new_round until the first input())
+    """
+    def __init__(self, rng, mix=None, rate=0.0, script=None, max_guesses=MAX_GUESSES,
+                 deadline=None):
+        self.rng = rng
+        self.mix = dict(MIX if mix is None else mix)
+        self.pause = 1/rate if rate > 0 else 0.0 # seconds between guesses
+        self.script = list(script) if script else None
+        self.max_guesses = max_guesses
+        self.deadline = deadline # perf_counter time after which rounds are abandoned
+        self.mode = None
+        self.latencies = [] # seconds per guess of the current round
+        self.start_latency = None
+        self.counts = {} # kind of guess: guesses of the current round
+        self.solve_seconds = 0.0 # cpu time spent finding answers, not the game's
+        self._output = []
+        self._given = None
+        self._answers = None # correct answers not guessed yet
+        self._answered = []
+        self._started = None
+        self._guessed = None # perf_counter time the last guess was returned
+        self._next = 0.0 # earliest perf_counter time of the next guess
+        self._line = 0 # next line of script
+
+    def new_round(self, mode):
+        """Prepares for a round of the given mode, call right before the game starts"""
+        self.mode = mode
+        self.latencies, self.start_latency, self.counts = [], None, {}
+        self._output, self._given, self._answers, self._answered = [], None, None, []
+        self._guessed = None
+        self._started = perf_counter()
+
+    def finish(self):
+        """Records the last guess of the round, call once the game returned"""
+        if self._guessed is not None:
+            self.latencies.append(perf_counter() - self._guessed)
+            self._guessed = None
+
+    def write(self, text):
+        self._output.append(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        now = perf_counter()
+        if self._guessed is None:
+            self.start_latency = now - self._started
+        else:
+            self.latencies.append(now - self._guessed)
+        if self._given is None:
+            self._read_given()
+        if len(self.latencies) >= self.max_guesses or \
+           (self.deadline is not None and now >= self.deadline):
+            self._guessed = None
+            raise Abandoned()
+        guess = self._guess()
+        if self.pause:
+            self._next = max(self._next + self.pause, perf_counter())
+            sleep(max(0.0, self._next - perf_counter()))
+        self._guessed = perf_counter()
+        return guess + '\n'
+
+    def _read_given(self):
+        """Not used by itself, finds the ==given== line the game printed"""
+        for line in ''.join(self._output).splitlines():
+            if len(line) > 4 and line.startswith('==') and line.endswith('=='):
+                self._given = line[2:-2]
+        self._output = []
+        if self.script is None:
+            start = thread_time()
+            if self.mode == 1:
+                answers = engine.find_anagrams(self._given)
+            else:
+                answers = [word for word in engine.possible_words(self._given) if \
+                           len(word) >= engine.AT_LEAST]
+            self.rng.shuffle(answers)
+            self._answers = answers
+            self.solve_seconds += thread_time() - start
+
+    def _guess(self):
+        """Not used by itself, returns the next guess and counts its kind"""
+        if self.script is not None:
+            kind, guess = 'script', self.script[self._line % len(self.script)]
+            self._line += 1
+        else:
+            kinds = [kind for kind in self.mix if kind != 'correct' or self._answers]
+            weights = [self.mix[kind] for kind in kinds]
+            kind = self.rng.choices(kinds, weights)[0] if sum(weights) else 'invalid'
+            guess = None
+            if kind == 'repeat' and self._answered:
+                guess = self.rng.choice(self._answered)
+            elif kind == 'wrong':
+                guess = self._wrong_word()
+            if kind == 'correct' or (guess is None and kind == 'repeat' and self._answers):
+                kind, guess = 'correct', self._answers.pop()
+                self._answered.append(guess)
+            elif guess is None: # one letter too many for both modes
+                kind, guess = 'invalid', self._given + self._given[0]
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        return guess
+
+    def _wrong_word(self):
+        """Not used by itself, returns letters of the round that are not a word,
+        None if none were found in a few tries
+        """
+        letters = list(self._given)
+        for _ in range(10):
+            if self.mode == 1:
+                self.rng.shuffle(letters)
+                guess = ''.join(letters)
+            else:
+                guess = ''.join(self.rng.sample(letters, self.rng.randint(
+                    min(engine.AT_LEAST, len(letters)), min(len(letters), 8))))
+            if guess != self._given and not engine.is_word(guess):
+                return guess
+        return None
+
+def run_bot(block_name, number, options, reports):
+    """Process target: plays rounds until options.rounds or options.seconds run out,
+    putting a ('round', ...) report per round and a final ('done', ...) report on reports
+    """
+    engine.set_dictionary(engine.attach_dictionary(block_name))
+    interface_terminal.ROUNDS.start()
+    rng = Random(None if options.seed is None else options.seed + number)
+    started = perf_counter()
+    bot = Bot(rng, options.mix, options.rate, options.script, options.max_guesses,
+              started + options.seconds if options.seconds > 0 else None)
+    played = 0
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin = sys.stdout = bot
+    try:
+        while not options.rounds or played < options.rounds:
+            if bot.deadline is not None and perf_counter() >= bot.deadline:
+                break
+            mode = rng.choice(options.modes)
+            bot.new_round(mode)
+            try:
+                GAMES[mode]()
+            except Abandoned:
+                abandoned = True
+            else:
+                abandoned = False
+            bot.finish()
+            played += 1
+            reports.put(('round', number, mode, abandoned, bot.start_latency,
+                         bot.latencies, bot.counts))
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+        interface_terminal.ROUNDS.stop()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    reports.put(('done', number, perf_counter() - started, usage.ru_utime + usage.ru_stime,
+                 bot.solve_seconds, interface_terminal.ROUNDS.metrics()))
+
+def parse_mix(text):
+    """Parses kind=weight,... into a dict, kinds are those of MIX"""
+    mix = {}
+    for item in text.split(','):
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in MIX:
+            raise argparse.ArgumentTypeError('unknown kind of guess {!r}'.format(kind))
+        try:
+            mix[kind] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError('weight of {} is not a number'.format(kind))
+    return mix
+
+def latency_metrics(latencies):
+    """Returns a dict of p50_ms, p90_ms, p99_ms and max_ms of a list of seconds"""
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    return {'p50_ms': bench.percentile(latencies, 0.50)*1000,
+            'p90_ms': bench.percentile(latencies, 0.90)*1000,
+            'p99_ms': bench.percentile(latencies, 0.99)*1000,
+            'max_ms': latencies[-1]*1000}
+
+def run(options):
+    """Runs the load and prints its progress\n
+    Returns a dict of the results, per game (game1, game2) and in total
+    """
+    block = engine.share_dictionary(engine.load_dictionary(options.dictionary))
+    reports = multiprocessing.Queue()
+    with solver.block_owned(block):
+        processes = [multiprocessing.Process(target=run_bot, daemon=True,
+                                             args=(block.name, number, options, reports))
+                     for number in range(options.processes)]
+        started = perf_counter()
+        for process in processes:
+            process.start()
+        games = {mode: {'rounds': 0, 'abandoned': 0, 'latencies': [], 'starts': [],
+                        'counts': {}} for mode in options.modes}
+        workers = []
+        interval_rounds, interval_latencies = 0, []
+        last = started
+        while len(workers) < len(processes):
+            try:
+                report = reports.get(timeout=options.interval)
+            except Empty:
+                report = None
+                if not any(process.is_alive() for process in processes):
+                    break # a bot died without reporting
+            if report is not None and report[0] == 'round':
+                _, _, mode, abandoned, start_latency, latencies, counts = report
+                game = games[mode]
+                game['rounds'] += 1
+                game['abandoned'] += abandoned
+                game['latencies'].extend(latencies)
+                if start_latency is not None:
+                    game['starts'].append(start_latency)
+                for kind, count in counts.items():
+                    game['counts'][kind] = game['counts'].get(kind, 0) + count
+                interval_rounds += 1
+                interval_latencies.extend(latencies)
+            elif report is not None:
+                workers.append(report)
+            now = perf_counter()
+            if now - last >= options.interval:
+                metrics = latency_metrics(interval_latencies)
+                print('{:>7.1f} s {:>9.1f} rounds/s {:>10.1f} guesses/s  p50 {:>8.3f} ms  '
+                      'p99 {:>8.3f} ms'.format(now - started, interval_rounds/(now - last),
+                                               len(interval_latencies)/(now - last),
+                                               metrics.get('p50_ms', 0.0),
+                                               metrics.get('p99_ms', 0.0)), flush=True)
+                interval_rounds, interval_latencies, last = 0, [], now
+        seconds = perf_counter() - started
+        for process in processes:
+            process.join()
+
+    cpu_seconds = sum(worker[3] for worker in workers)
+    solve_seconds = sum(worker[4] for worker in workers)
+    results = {'python': platform.python_version(), 'backend': engine.BACKEND,
+               'processes': options.processes, 'seconds': seconds,
+               'cpu_seconds': cpu_seconds, 'cpu_percent': 100*cpu_seconds/seconds,
+               'solve_seconds': solve_seconds,
+               'round_queue': {}, 'dictionaries': {options.dictionary: {}}}
+    games_results = results['dictionaries'][options.dictionary]
+    all_rounds, all_latencies = 0, []
+    for mode, game in games.items():
+        metrics = {'rounds': game['rounds'], 'abandoned': game['abandoned'],
+                   'throughput': game['rounds']/seconds, 'guesses': len(game['latencies']),
+                   'counts': game['counts']}
+        metrics.update(latency_metrics(game['latencies']))
+        metrics['start_ms'] = latency_metrics(game['starts'])
+        games_results['game{}'.format(mode)] = metrics
+        all_rounds += game['rounds']
+        all_latencies.extend(game['latencies'])
+    games_results['total'] = dict(latency_metrics(all_latencies), rounds=all_rounds,
+                                  throughput=all_rounds/seconds, guesses=len(all_latencies),
+                                  cpu_ms_per_round=1000*(cpu_seconds - solve_seconds) \
+                                                   /all_rounds if all_rounds else 0.0)
+    for worker in workers: # round queue counters summed over the bots
+        for mode, stats in worker[5].items():
+            total = results['round_queue'].setdefault(str(mode), {})
+            for key in ('hits', 'misses', 'stale', 'refills', 'on_demand'):
+                total[key] = total.get(key, 0) + stats[key]
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulated players for the terminal game')
+    parser.add_argument('--dictionary', default=DICTIONARY_FILENAME)
+    parser.add_argument('--processes', type=int, default=cpu_count() or 1,
+                        help='bots playing at once, one process each, default cpu count')
+    parser.add_argument('--seconds', type=float, default=SECONDS,
+                        help='how long to play, 0 to stop after --rounds')
+    parser.add_argument('--rounds', type=int, default=0,
+                        help='rounds per bot, 0 for as many as fit in --seconds')
+    parser.add_argument('--modes', type=int, nargs='+', choices=sorted(GAMES),
+                        default=sorted(GAMES), help='game modes picked at random per round')
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='guesses per second per bot, 0 for as fast as possible')
+    parser.add_argument('--mix', type=parse_mix, default=MIX,
+                        help='weights of the kinds of guesses, default '
+                             + ','.join('{}={}'.format(*item) for item in MIX.items()))
+    parser.add_argument('--script', help='replay the guesses of this file, one per line')
+    parser.add_argument('--max-guesses', type=int, default=MAX_GUESSES,
+                        help='guesses after which a round is abandoned')
+    parser.add_argument('--interval', type=float, default=INTERVAL,
+                        help='seconds between progress lines')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--backend', choices=engine.BACKENDS, help='possible_words backend')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=bench.THRESHOLD,
+                        help='allowed regression as a fraction, default %(default)s')
+    args = parser.parse_args(argv)
+    if args.seconds <= 0 and args.rounds <= 0:
+        parser.error('--seconds or --rounds must be positive')
+    if args.backend:
+        engine.set_backend(args.backend)
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as script:
+            args.script = [line.strip() for line in script if line.strip()]
+        if not args.script:
+            parser.error('--script has no guesses')
+
+    results = run(args)
+    print('{} bots, {:.1f} s, cpu {:.1f} s ({:.0f}% of a core, {:.1f} s finding answers)'
+          .format(results['processes'], results['seconds'], results['cpu_seconds'],
+                  results['cpu_percent'], results['solve_seconds']))
+    for game, metrics in results['dictionaries'][args.dictionary].items():
+        print('{:<6} {:>7} rounds {:>9.1f} rounds/s {:>8} guesses  p50 {:>8.3f} ms  '
+              'p90 {:>8.3f} ms  p99 {:>8.3f} ms  max {:>8.3f} ms'.format(
+                  game, metrics['rounds'], metrics['throughput'], metrics['guesses'],
+                  metrics.get('p50_ms', 0.0), metrics.get('p90_ms', 0.0),
+                  metrics.get('p99_ms', 0.0), metrics.get('max_ms', 0.0)))
+        if 'start_ms' in metrics:
+            print('{:<6} {:>7} abandoned  start p50 {:>8.3f} ms  p99 {:>8.3f} ms  {}'.format(
+                game, metrics['abandoned'], metrics['start_ms'].get('p50_ms', 0.0),
+                metrics['start_ms'].get('p99_ms', 0.0), ' '.join(
+                    '{}={}'.format(*item) for item in sorted(metrics['counts'].items()))))
+    print('game cpu per round {:.3f} ms, round queue {}'.format(
+        results['dictionaries'][args.dictionary]['total']['cpu_ms_per_round'],
+        ' '.join('mode {} hits={hits} misses={misses}'.format(mode, **stats)
+                 for mode, stats in sorted(results['round_queue'].items()))))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline:
+            regressions = bench.compare(results, json.load(baseline), args.threshold, TRACKED)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
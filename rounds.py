@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word Game! round pre-generation\n
+Keeps a bounded queue of ready rounds per game mode, refilled by background threads,
+so a game can start without waiting for its puzzle to be generated
+"""
+import threading
+from queue import Queue, Empty, Full
+from time import perf_counter
+import engine
+
+DEPTH = 4 # ready rounds kept per mode
+MODES = (1, 2) # game modes as accepted by engine.make_round
+
+class RoundQueue:
+    """Bounded queues of engine.Round per mode, refilled in the background\n
+    Rounds are generated against engine.LEXICON and rounds from any other lexicon
+    (after the dictionary was changed) are thrown away instead of being played.
+    With word_graph, the refill of mode 2 also builds the word graph of each new
+    lexicon, for interfaces that follow the typed letters with a PrefixCursor. With
+    racks, another thread builds the RackIndex of each new lexicon and grows it for
+    the bands engine.generate_rack missed without waiting
+    """
+    def __init__(self, depth=DEPTH, modes=MODES, word_graph=False, racks=False):
+        self.depth = depth
+        self.word_graph = word_graph
+        self.racks = racks
+        self.queues = {mode: Queue(depth) for mode in modes}
+        # refills are made by the background threads, on_demand rounds by get after a miss
+        self.stats = {mode: {'hits': 0, 'misses': 0, 'stale': 0, 'refills': 0,
+                             'refill_seconds': 0.0, 'refill_seconds_max': 0.0,
+                             'refill_seconds_last': 0.0, 'on_demand': 0,
+                             'on_demand_seconds': 0.0, 'on_demand_seconds_max': 0.0,
+                             'on_demand_seconds_last': 0.0} for mode in modes}
+        self._lock = threading.Lock() # guards stats
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Starts one refilling thread per mode, and the rack indexing thread"""
+        self._stopping.clear()
+        for mode in self.queues:
+            thread = threading.Thread(target=self._refill, args=(mode,),
+                                      name='round-queue-{}'.format(mode), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.racks:
+            thread = threading.Thread(target=self._index_racks, name='round-queue-racks',
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stops the refilling threads and waits for them to finish"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def flush(self):
+        """Throws away every queued round, used after the dictionary is changed"""
+        for rounds in self.queues.values():
+            while True:
+                try:
+                    rounds.get_nowait()
+                except Empty:
+                    break
+
+    def get(self, mode):
+        """Returns a round of the given mode for the current engine.LEXICON\n
+        Takes a queued round when one is ready, otherwise generates one right away
+        """
+        rounds = self.queues[mode]
+        while True:
+            try:
+                new_round = rounds.get_nowait()
+            except Empty:
+                break
+            if new_round.lexicon is engine.LEXICON:
+                self._count(mode, 'hits')
+                return new_round
+            self._count(mode, 'stale')
+        self._count(mode, 'misses')
+        return self._generate(mode, 'on_demand')
+
+    def metrics(self):
+        """Returns a dict of mode: dict of queue depth, capacity and refill statistics\n
+        refill_seconds_mean is the average time the background threads took to generate
+        one round, on_demand_seconds_mean the average time a miss waited for one
+        """
+        with self._lock:
+            metrics = {mode: dict(stats) for mode, stats in self.stats.items()}
+        for mode, stats in metrics.items():
+            stats['depth'] = self.queues[mode].qsize()
+            stats['capacity'] = self.depth
+            stats['refill_seconds_mean'] = stats['refill_seconds']/stats['refills'] \
+                                           if stats['refills'] else 0.0
+            stats['on_demand_seconds_mean'] = stats['on_demand_seconds']/stats['on_demand'] \
+                                              if stats['on_demand'] else 0.0
+        return metrics
+
+    def _count(self, mode, key):
+        """Not used by itself, increments a counter of stats"""
+        with self._lock:
+            self.stats[mode][key] += 1
+
+    def _generate(self, mode, kind='refill'):
+        """Not used by itself, generates a round and records how long it took in the
+        counters of kind, refill or on_demand
+        """
+        start = perf_counter()
+        new_round = engine.make_round(mode)
+        seconds = perf_counter() - start
+        with self._lock:
+            stats = self.stats[mode]
+            stats['refills' if kind == 'refill' else kind] += 1
+            stats[kind + '_seconds'] += seconds
+            stats[kind + '_seconds_last'] = seconds
+            stats[kind + '_seconds_max'] = max(stats[kind + '_seconds_max'], seconds)
+        return new_round
+
+    def _refill(self, mode):
+        """Not used by itself, thread target that keeps the queue of a mode full"""
+        rounds = self.queues[mode]
+        new_round = None
+        while not self._stopping.is_set():
+            if new_round is None or new_round.lexicon is not engine.LEXICON:
+                if not engine.LEXICON.words:
+                    self._stopping.wait(0.1) # no dictionary yet
+                    continue
+                try:
+                    new_round = self._generate(mode)
+                except ValueError: # dictionary cannot make this mode's rounds
+                    self._stopping.wait(1)
+                    continue
+                if self.word_graph and mode == 2: # built here rather than on the first round
+                    new_round.lexicon.word_graph()
+            try:
+                rounds.put(new_round, timeout=0.1)
+            except Full:
+                continue
+            new_round = None
+
+    def _index_racks(self):
+        """Not used by itself, thread target that builds the rack index of engine.LEXICON
+        and grows it for missed bands
+        """
+        while not self._stopping.is_set():
+            lexicon = engine.LEXICON
+            if not lexicon.words:
+                self._stopping.wait(0.1) # no dictionary yet
+                continue
+            rack_index = lexicon.rack_index()
+            while lexicon is engine.LEXICON and not self._stopping.is_set():
+                try:
+                    min_words, max_words = rack_index.missed.get(timeout=0.1)
+                except Empty:
+                    continue
+                if len(rack_index) >= engine.RACK_LIMIT:
+                    continue
+                try:
+                    rack_index.find(min_words, max_words) # grown for an earlier miss
+                except ValueError:
+                    rack_index.grow(min_words, max_words)
+
+def main():
+    print("This is a module used by 'Word Game!' game.")
+    print('It generates rounds in the background')
+    input('Press anything to continue...')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word Game! multiplayer server\n
+Headless asyncio TCP server running Find Anagrams and Construct Words sessions
+from the engine game logic, alone or racing other players on one puzzle in a room\n
+Protocol: one command per line, one or more reply lines per command
+    PLAY <mode>          start a solo round, mode 1 (Find Anagrams) or 2 (Construct Words)
+    JOIN <room> <mode>   join (or open) a room where every player races on one puzzle
+    GUESS <word>         answer the current round
+    STATUS               show the current round
+    QUIT                 close the connection
+Replies: ROUND <mode> <given> <lives> <seconds>, CORRECT <word> <points> <score>,
+WRONG <lives>, INVALID, REPEAT, BASE, TAKEN <player>, END <score> <reason>, ERR <message>
+and, to everyone in a room, CLAIMED <player> <word>\n
+Usage: python server.py [--port PORT] [--dictionary FILE] [--watch]  (serve)
+       python server.py --connect [--port PORT]                   (local line client)
+"""
+import argparse
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import engine
+import rounds
+
+HOST = '127.0.0.1'
+PORT = 8765
+DICTIONARY_FILENAME = 'tagalog.txt'
+TIME_LIMIT = 60 # seconds per round, 0 for untimed
+WORKERS = 4 # threads generating rounds so the event loop never does dictionary work
+
+class Room:
+    """Players racing on one round, each word may only be claimed once"""
+    def __init__(self, name, mode, ready):
+        self.name = name
+        self.mode = mode
+        self.ready = ready # future of the round, shared by everyone joining while it is made
+        self.round = None # set once ready is done
+        self.deadline = None # set once ready is done
+        self.players = set() # Session
+        self.claimed = {} # word: player name
+
+class Session:
+    """One connected player, playing rounds with an engine.GameSession of their mode"""
+    def __init__(self, server, writer, name):
+        self.server = server
+        self.writer = writer
+        self.name = name
+        self.game = None # engine.GameSession of the current round, None between rounds
+        self.room = None
+        self.deadline = None # loop time the round ends at, None if untimed
+        self._timer = None
+
+    def send(self, *lines):
+        """Queues reply lines to the player"""
+        self.writer.write(''.join(line + '\n' for line in lines).encode('utf-8'))
+
+    def start(self, new_round, room=None, deadline=None):
+        """Starts playing new_round, in room if given"""
+        self.game = engine.new_session(new_round.mode)
+        self.game.start(new_round)
+        self.room, self.deadline = room, deadline
+        if deadline is not None:
+            self._timer = asyncio.get_running_loop().call_at(deadline, self.end, 'time')
+        self.send(self.status())
+
+    def status(self):
+        """Returns the ROUND reply of the current round"""
+        if self.game is None:
+            return 'ERR no round, send PLAY or JOIN'
+        seconds = 0 if self.deadline is None else \
+                  max(0, int(self.deadline - asyncio.get_running_loop().time()))
+        return 'ROUND {} {} {} {}'.format(self.game.mode, self.game.round.given,
+                                          self.game.lives, seconds)
+
+    def guess(self, answer):
+        """Checks an answer with the rules of the round's game mode"""
+        if self.game is None:
+            self.send('ERR no round, send PLAY or JOIN')
+            return
+        claimed = self.room.claimed if self.room else {}
+        answer = self.game.normalize(answer) or answer # claimed words are normalized
+        # words found by another player in the room are taken instead of correct
+        outcome, points = self.game.check(answer)
+        if outcome == engine.CORRECT and answer in claimed:
+            self.send('TAKEN {}'.format(claimed[answer]))
+            return
+        outcome, points = self.game.submit(answer)
+        if outcome == engine.CORRECT:
+            self.send('CORRECT {} {} {}'.format(answer, points, self.game.score))
+            if self.room:
+                claimed[answer] = self.name
+                for player in self.room.players:
+                    if player is not self:
+                        player.send('CLAIMED {} {}'.format(self.name, answer))
+                # Find Anagrams ends once every anagram was found by anyone in the room
+                if self.game.mode == 1 and len(claimed) == len(self.game.round.solutions):
+                    for player in list(self.room.players):
+                        player.end('solved')
+        elif outcome == engine.WRONG:
+            self.send('WRONG {}'.format(self.game.lives))
+        else:
+            self.send(outcome.upper())
+        if self.game is not None and not self.game.running:
+            self.end(self.game.reason)
+
+    def round_failed(self, error):
+        """Tells the player their round could not be made"""
+        self.send('ERR no round could be made: {}'.format(error or type(error).__name__))
+
+    def end(self, reason):
+        """Ends the current round, reason is one of time, lives, solved or quit"""
+        if self.game is None:
+            return
+        self.game.end(reason)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.room:
+            self.server.leave(self)
+        score = self.game.score
+        self.game, self.room, self.deadline = None, None, None
+        if reason != 'quit':
+            self.send('END {} {}'.format(score, reason))
+
+class Server:
+    """Accepts connections and runs a Session per connection"""
+    def __init__(self, time_limit=TIME_LIMIT, workers=WORKERS):
+        self.time_limit = time_limit
+        self.executor = ThreadPoolExecutor(workers)
+        self.rounds = rounds.RoundQueue()
+        self.rooms = {} # name: Room
+        self.sessions = set()
+        self._players = 0
+
+    async def new_round(self, mode):
+        """Returns a new round, made on the executor"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                                 self.rounds.get, mode)
+
+    def deadline(self):
+        """Returns the loop time a round started now ends at, None if untimed"""
+        if self.time_limit <= 0:
+            return None
+        return asyncio.get_running_loop().time() + self.time_limit
+
+    async def join(self, session, name, mode):
+        """Puts session in the room called name, opening it with a new round if needed"""
+        room = self.rooms.get(name)
+        if room is None or room.mode != mode or \
+           (room.deadline is not None and room.deadline <= asyncio.get_running_loop().time()):
+            room = Room(name, mode, asyncio.ensure_future(self.new_round(mode)))
+            self.rooms[name] = room
+        try:
+            new_round = await room.ready
+        except Exception as error: # whatever failed in the executor
+            # everyone waiting on the room gets the error, the next JOIN opens it again
+            if self.rooms.get(name) is room:
+                del self.rooms[name]
+            session.round_failed(error)
+            return
+        if room.round is None:
+            room.round, room.deadline = new_round, self.deadline()
+        room.players.add(session)
+        session.start(room.round, room, room.deadline)
+
+    def leave(self, session):
+        """Takes session out of its room, closing the room once it is empty"""
+        room = session.room
+        room.players.discard(session)
+        if not room.players and self.rooms.get(room.name) is room:
+            del self.rooms[room.name]
+
+    async def handle(self, reader, writer):
+        """Runs one connection until it sends QUIT or disconnects"""
+        self._players += 1
+        session = Session(self, writer, 'player{}'.format(self._players))
+        self.sessions.add(session)
+        session.send('HELLO {}'.format(session.name))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, argument = line.decode('utf-8', 'replace').strip().partition(' ')
+                command = command.upper()
+                if command == 'GUESS':
+                    session.guess(argument.strip())
+                elif command in ('PLAY', 'JOIN'):
+                    arguments = argument.split()
+                    mode = arguments[-1] if arguments else ''
+                    if mode not in ('1', '2') or (command == 'JOIN') != (len(arguments) == 2):
+                        session.send('ERR usage: PLAY <mode> or JOIN <room> <mode>')
+                        continue
+                    session.end('quit')
+                    if command == 'PLAY':
+                        try:
+                            new_round = await self.new_round(int(mode))
+                        except Exception as error: # whatever failed in the executor
+                            session.round_failed(error)
+                        else:
+                            session.start(new_round, None, self.deadline())
+                    else:
+                        await self.join(session, arguments[0], int(mode))
+                elif command == 'STATUS':
+                    session.send(session.status())
+                elif command == 'QUIT':
+                    break
+                else:
+                    session.send('ERR unknown command {}'.format(command))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            session.end('quit')
+            self.sessions.discard(session)
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        """Serves forever"""
+        self.rounds.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.rounds.stop()
+            self.executor.shutdown()
+
+async def client(host=HOST, port=PORT):
+    """Local line client: sends stdin lines to the server and prints its replies"""
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+    async def print_replies():
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            print(line.decode('utf-8').rstrip('\n'), flush=True)
+    replies = asyncio.ensure_future(print_replies())
+    while not replies.done():
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        writer.write(line.encode('utf-8'))
+        await writer.drain()
+    writer.close()
+    await replies
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Word Game! multiplayer server')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--dictionary', default=DICTIONARY_FILENAME)
+    parser.add_argument('--time-limit', type=int, default=TIME_LIMIT,
+                        help='seconds per round, 0 for untimed')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--watch', action='store_true',
+                        help='apply changes of the dictionary file while serving')
+    parser.add_argument('--connect', action='store_true', help='run the local line client')
+    args = parser.parse_args(argv)
+    if args.connect:
+        asyncio.run(client(args.host, args.port))
+        return
+    engine.set_dictionary(engine.load_dictionary(args.dictionary))
+    print('Serving {} words on {}:{}'.format(len(engine.LEXICON), args.host, args.port))
+    # rounds being played keep the lexicon they were made from, new rounds use the update
+    watcher = engine.DictionaryWatcher(args.dictionary) if args.watch else None
+    if watcher:
+        watcher.start()
+    try:
+        asyncio.run(Server(args.time_limit, args.workers).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher:
+            watcher.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word Game! batch solver\n
+Solves racks (possible_words) or words (find_anagrams) read one per line from files
+or stdin across a process pool, streaming JSON Lines results to stdout\n
+Usage: python solver.py [--query words|anagrams] [--order input|completion] [FILE...]
+"""
+import argparse
+import fileinput
+import json
+import os
+import sys
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from time import perf_counter
+import engine
+
+DICTIONARY_FILENAME = 'tagalog.txt'
+CHUNK_SIZE = 64 # queries sent to a worker at a time
+PENDING_CHUNKS = 4 # chunks in flight per worker, bounds memory on endless input
+
+def init_worker(block_name):
+    """Process pool initializer: attaches the dictionary shared by solve once per worker"""
+    engine.set_dictionary(engine.attach_dictionary(block_name))
+
+def solve_chunk(query, chunk):
+    """Solves a list of queries in a worker, returns a list of result dicts"""
+    if query != 'anagrams':
+        # racks are solved once each, caching them would only churn the query cache
+        return [{'rack': text, 'words': words} for text, words in \
+                zip(chunk, engine.possible_words_batch(chunk, cache=False))]
+    results = []
+    for text in chunk:
+        try:
+            anagrams = engine.find_anagrams(text)
+        except ValueError: # not a dictionary word, so its whole class are anagrams
+            anagrams = list(engine.LEXICON.anagram_index.get(engine.get_signature(text), ()))
+        results.append({'word': text, 'anagrams': anagrams})
+    return results
+
+def read_chunks(lines, chunk_size=CHUNK_SIZE):
+    """Yields lists of up to chunk_size stripped, non-empty lines"""
+    lines = (line.strip() for line in lines)
+    lines = (line for line in lines if line)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+@contextmanager
+def block_owned(block):
+    """Closes and unlinks a shared memory block when the with block is left"""
+    try:
+        yield block
+    finally:
+        block.close()
+        block.unlink()
+
+def solve(lines, query='words', dictionary_filename=DICTIONARY_FILENAME, workers=None,
+          chunk_size=CHUNK_SIZE, ordered=True):
+    """Yields result dicts of every line, in input order if ordered is True, otherwise
+    as soon as their chunk is done. At most PENDING_CHUNKS chunks per worker are read ahead
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = read_chunks(lines, chunk_size)
+    # built once here, every worker maps the same letter matrix and scores
+    block = engine.share_dictionary(engine.load_dictionary(dictionary_filename))
+    with block_owned(block), ProcessPoolExecutor(workers, initializer=init_worker,
+                                                 initargs=(block.name,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(solve_chunk, query, chunk))
+            if len(pending) < workers*PENDING_CHUNKS:
+                continue
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+        while pending:
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve racks or anagram queries in bulk')
+    parser.add_argument('files', nargs='*', help='input files, stdin if none or -')
+    parser.add_argument('--query', choices=('words', 'anagrams'), default='words',
+                        help='possible_words of racks or find_anagrams of words')
+    parser.add_argument('--dictionary', default=DICTIONARY_FILENAME)
+    parser.add_argument('--workers', type=int, help='worker processes, default cpu count')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--order', choices=('input', 'completion'), default='input')
+    args = parser.parse_args(argv)
+
+    start = perf_counter()
+    count = 0
+    try:
+        with fileinput.input(args.files) as lines:
+            for result in solve(lines, args.query, args.dictionary, args.workers,
+                                args.chunk_size, args.order == 'input'):
+                sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+                count += 1
+    except BrokenPipeError: # output closed early, e.g. piped into head
+        # point stdout at devnull so flushing it at exit does not raise again
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+    seconds = perf_counter() - start
+    sys.stderr.write('{} queries in {:.2f} s ({:.1f} queries/s)\n'.format(
+        count, seconds, count/seconds if seconds else 0.0))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word Game! engine tests\n
+Usage: python -m pytest test_engine.py
+"""
+import os
+import threading
+import time
+from random import Random
+import pytest
+import engine
+import rounds
+
+DICTIONARY_FILENAME = 'tagalog.txt'
+
+def graph_words(graph):
+    """Returns the set of every word in a WordGraph"""
+    words = set()
+    def walk(node, prefix):
+        if node.terminal:
+            words.add(prefix)
+        for letter, child in node.children.items():
+            walk(child, prefix + letter)
+    walk(graph.root, '')
+    return words
+
+def assert_same_lexicon(lexicon, words):
+    """Asserts that lexicon indexes exactly words, like a Lexicon built from them would"""
+    rebuilt = engine.Lexicon(words)
+    assert sorted(lexicon.words) == sorted(rebuilt.words)
+    assert lexicon.word_set == rebuilt.word_set
+    assert {key: sorted(value) for key, value in lexicon.anagram_index.items()} == \
+           {key: sorted(value) for key, value in rebuilt.anagram_index.items()}
+    pool = lexicon.anagram_pool
+    assert sorted(word for word in pool if word is not None) == sorted(rebuilt.anagram_pool)
+    assert lexicon.anagram_pool_counts == rebuilt.anagram_pool_counts
+    counts = lexicon.anagram_pool_counts
+    ends = pool.ends if isinstance(pool, engine._OverlayPool) else counts
+    for at_least in range(1, len(counts)):
+        found = [pool[index] for index in range(ends[at_least]) if pool[index] is not None]
+        assert len(found) == counts[at_least]
+        for word in found:
+            assert len(lexicon.anagram_index[lexicon._signature(word)]) > at_least
+    if lexicon._word_scores is not None:
+        assert list(lexicon._word_scores) == [lexicon.language.score(word) for \
+                                              word in lexicon.words]
+    if lexicon._letter_matrix is not None:
+        alphabet, matrix = lexicon._letter_matrix
+        rebuilt_alphabet, rebuilt_matrix = engine.build_letter_matrix(lexicon.words)
+        columns = [alphabet[letter] for letter in sorted(rebuilt_alphabet,
+                                                         key=rebuilt_alphabet.get)]
+        assert (matrix[:, columns] == rebuilt_matrix).all()
+    if lexicon._word_graph is not None:
+        assert graph_words(lexicon._word_graph) == {word.lower() for word in words}
+    if lexicon._lowered_index is not None:
+        assert len(lexicon._lowered_index) == len(lexicon.words)
+        for lowered, indexes in lexicon._lowered_index.items():
+            assert indexes and all(lexicon.words[index] == lowered for index in indexes)
+            assert lowered in lexicon._word_graph
+    rng = Random(1)
+    for _ in range(10):
+        chars = engine.combine_words(rng.choices(lexicon.words, k=2))
+        expected = sorted(engine.possible_words(chars, rebuilt, 'python'))
+        # ties may be broken differently as words are in another order
+        best = [(rebuilt.language.score(word), len(word)) for \
+                word in engine.best_words(chars, 5, rebuilt, 'python')]
+        for backend in engine.BACKENDS:
+            if backend != 'numpy' or engine.numpy is not None:
+                assert sorted(engine.possible_words(chars, lexicon, backend)) == expected
+                assert [(lexicon.language.score(word), len(word)) for \
+                        word in engine.best_words(chars, 5, lexicon, backend)] == best
+
+@pytest.fixture(scope='module')
+def dictionary():
+    return engine.open_dictionary(DICTIONARY_FILENAME)
+
+def test_updated_matches_rebuild(dictionary):
+    lexicon = engine.Lexicon(dictionary)
+    lexicon.word_graph()
+    lexicon.word_scores()
+    if engine.numpy is not None:
+        lexicon.letter_matrix()
+    original = list(lexicon.words)
+    words = set(lexicon.words)
+    rng = Random(0)
+    for batch in range(30):
+        removed = rng.sample(sorted(words), rng.randint(0, 50))
+        added = [''.join(rng.choices('aeioungst', k=rng.randint(3, 7))) for \
+                 _ in range(rng.randint(0, 50))]
+        added += [word[::-1] for word in rng.sample(sorted(words), 10)]
+        if batch == 5:
+            added.append('zzqx') # a new letter, the letter matrix is built again
+        updated = lexicon.updated(added, removed)
+        if batch % 3 == 0:
+            updated.word_graph()
+        words = (words - set(removed)) | set(added)
+        assert_same_lexicon(updated, sorted(words))
+        lexicon = updated
+        if batch == 5 and engine.numpy is not None:
+            lexicon.letter_matrix()
+    assert engine.Lexicon(dictionary).words == original
+
+def test_updated_compiled_lexicon_stays_compiled(tmp_path, monkeypatch):
+    filename = tmp_path / 'dictionary.txt'
+    words = ['aso', 'oas', 'sao', 'pusa', 'upas', 'bahay', 'araw', 'wara']
+    filename.write_text('\n'.join(words) + '\n')
+    engine.compile_dictionary(str(filename))
+    lexicon = engine.load_dictionary(str(filename))
+    monkeypatch.setattr(engine, 'OVERLAY_LIMIT', 6)
+    words, merges = set(words), 0
+    for added, removed in ((['saa', 'asa'], ['aso']), (['aso'], ['bahay', 'saa']),
+                           (['yahab'], ['araw']), (['bahay', 'puas'], ['upas', 'oas'])):
+        updated = lexicon.updated(added, removed)
+        words = (words - set(removed)) | set(added)
+        assert updated._buffer is not None # read in place, overlaid or merged
+        assert isinstance(updated.word_set, (engine._BlockWordSet, engine._OverlayWordSet))
+        assert_same_lexicon(updated, sorted(words))
+        assert engine.get_anagram_set(1, lexicon=updated)[0] in updated
+        merges += updated._overlay is None
+        lexicon = updated
+    assert merges # merged into a new compiled buffer once over the limit
+
+def test_updated_leaves_lexicon_unchanged():
+    lexicon = engine.Lexicon(['aso', 'oas', 'sao', 'pusa'])
+    updated = lexicon.updated(['upas'], ['aso'])
+    assert lexicon.words == ['aso', 'oas', 'sao', 'pusa'] and 'aso' in lexicon
+    assert 'aso' not in updated and 'upas' in updated
+    assert lexicon.updated() is lexicon
+
+def test_word_graph_updated():
+    graph = engine.WordGraph(['abc', 'abd', 'x'])
+    graph.minimize()
+    updated = graph.updated(['abe'], ['abc', 'x'])
+    assert 'abc' in graph and 'x' in graph and 'abe' not in graph
+    assert 'abe' in updated and 'abd' in updated
+    assert 'abc' not in updated and 'x' not in updated
+    assert 'x' not in updated.root.children # nodes leading nowhere are dropped
+    with pytest.raises(ValueError):
+        updated.add('y')
+
+def test_prefix_cursor():
+    cursor = engine.prefix_cursor(engine.Lexicon(['aso', 'asul', 'oas']))
+    with pytest.raises(IndexError):
+        cursor.pop()
+    assert cursor.viable and not cursor.complete and len(cursor) == 0
+    assert cursor.push('A') == (True, False)
+    assert cursor.push('s') == (True, False)
+    assert cursor.push('o') == (True, True)
+    assert cursor.push('x') == (False, False) # off the graph
+    assert cursor.push('u') == (False, False) # stays off
+    assert len(cursor) == 5
+    assert cursor.pop() == (False, False)
+    assert cursor.pop() == (True, True) # back on the graph at 'aso'
+    assert cursor.pop() == (True, False)
+    cursor.reset()
+    assert len(cursor) == 0 and cursor.viable and not cursor.complete
+    assert cursor.push('o') == (True, False)
+
+def test_watcher_compares_normalized_words(tmp_path):
+    filename = tmp_path / 'dictionary.txt'
+    filename.write_text('Maria\nmaria\naso\n')
+    lexicon = engine.load_dictionary(str(filename))
+    watcher = engine.DictionaryWatcher(str(filename), lexicon=lexicon)
+    filename.write_text('maria\naso\npusa\n')
+    updated = watcher.check()
+    assert engine.is_word('maria', updated) and engine.is_word('pusa', updated)
+    assert watcher.stats['added'] == 1 and watcher.stats['removed'] == 0
+    assert watcher.check() is None
+
+def test_attached_lexicon_reads_block(dictionary):
+    lexicon = engine.Lexicon(dictionary)
+    block = engine.share_dictionary(lexicon)
+    try:
+        attached = engine.attach_dictionary(block.name)
+        assert list(attached.words) == lexicon.words and len(attached) == len(lexicon)
+        assert attached.words[-1] == lexicon.words[-1]
+        assert attached.words[3:6] == lexicon.words[3:6]
+        assert all(word in attached.word_set for word in lexicon.words)
+        assert 'qqqq' not in attached.word_set and None not in attached.word_set
+        assert dict(attached.anagram_index.items()) == lexicon.anagram_index
+        assert 'zzz' not in attached.anagram_index
+        assert tuple(attached.anagram_pool) == lexicon.anagram_pool
+        assert attached.anagram_pool_counts == lexicon.anagram_pool_counts
+        for word in lexicon.words[:200]:
+            assert engine.find_anagrams(word, attached) == engine.find_anagrams(word, lexicon)
+        updated = attached.updated(['zzz'], [lexicon.words[0]])
+        assert 'zzz' in updated and lexicon.words[0] not in updated
+        del attached, updated
+    finally:
+        block.close()
+        block.unlink()
+
+def test_compiled_dictionary(tmp_path):
+    filename = tmp_path / 'dictionary.txt'
+    filename.write_text('aso\noas\nsao\npusa\nMaria\n')
+    engine.compile_dictionary(str(filename))
+    lexicon = engine.load_dictionary(str(filename))
+    assert lexicon._buffer is not None
+    assert sorted(lexicon.words) == ['aso', 'maria', 'oas', 'pusa', 'sao']
+    assert engine.find_anagrams('aso', lexicon) == ['oas', 'sao']
+    assert engine.get_anagram_set(2, lexicon=lexicon)[0] in ('aso', 'oas', 'sao')
+
+def test_compiled_dictionary_is_checked_against_its_source(tmp_path):
+    filename = tmp_path / 'dictionary.txt'
+    filename.write_text('aso\noas\nsao\npusa\n')
+    name = str(filename)
+    engine.compile_dictionary(name)
+    status = os.stat(name)
+    os.utime(name, ns=(status.st_atime_ns, status.st_mtime_ns + 10**9)) # touched only
+    assert engine.load_compiled_dictionary(name)._buffer is not None # contents match
+    with pytest.raises(ValueError):
+        engine.load_compiled_dictionary(name, engine.Language('filipino', engine.SCRABBLE))
+    filename.write_text('aso\noas\nsao\nupas\n') # same size, other contents
+    with pytest.raises(ValueError):
+        engine.load_compiled_dictionary(name)
+    filename.write_text('aso\noas\nsao\npusa\nupas\n')
+    os.utime(name, ns=(status.st_atime_ns, status.st_mtime_ns)) # size alone tells
+    with pytest.raises(ValueError):
+        engine.load_compiled_dictionary(name)
+    lexicon = engine.load_dictionary(name)
+    assert lexicon._buffer is None and 'upas' in lexicon
+    engine.compile_dictionary(name)
+    with open(name + engine.CACHE_SUFFIX, 'r+b') as cache:
+        cache.write(b'junk')
+    with pytest.raises(ValueError):
+        engine.load_compiled_dictionary(name)
+    lexicon = engine.load_dictionary(name) # read from the text file instead
+    assert lexicon._buffer is None and sorted(lexicon.words) == \
+           ['aso', 'oas', 'pusa', 'sao', 'upas']
+
+def test_guesses_are_normalized():
+    lexicon = engine.Lexicon(['agosto', 'aso', 'oas', 'sao', 'pusa'])
+    assert engine.is_word('Agosto', lexicon) and not engine.is_word('Agost', lexicon)
+    assert engine.find_anagrams('ASO', lexicon) == ['oas', 'sao']
+    session = engine.ConstructSession(lexicon=lexicon)
+    session.start(engine.Round(2, 'agostopu', ('agosto',), lexicon))
+    assert session.submit('Agosto')[0] == engine.CORRECT
+    assert session.submit('agosto') == (engine.REPEAT, 0)
+    session = engine.AnagramSession(lexicon=lexicon)
+    session.start(engine.Round(1, 'aso', ('oas', 'sao'), lexicon))
+    assert session.submit('OAS') == (engine.CORRECT, 1)
+    assert session.check('Aso') == (engine.BASE, 0)
+    assert session.answers == {'oas'}
+
+def test_game_session_needs_a_mode():
+    with pytest.raises(TypeError): # _check is abstract
+        engine.GameSession()
+
+def test_scores_below_the_best_are_kept(tmp_path):
+    filename = str(tmp_path / 'save')
+    store = engine.HighScoreStore(filename, top=3)
+    assert not store.qualifies(0, 0) and store.qualifies(1, 0)
+    for name, score in (('a', 5), ('b', 3), ('c', 4)):
+        store.add(name, score, 0)
+    assert store.qualifies(4, 0) and not store.qualifies(3, 0)
+    store.add('d', 4, 0)
+    assert store.get(0) == [('a', 5), ('c', 4), ('d', 4)]
+
+def test_legacy_highscores_are_read_and_upgraded(tmp_path):
+    contents = 'ana\n7\nNone\n0\nben\n12\n' # mode 1 unused, no line for mode 3
+    assert engine.parse_highscores(contents) == {0: [('ana', 7)], 2: [('ben', 12)]}
+    assert engine.parse_highscores('ana\n7\nben\n') == {0: [('ana', 7)]} # score missing
+    assert engine.parse_highscores('ana\n7\nben') == {0: [('ana', 7)]}
+    filename = tmp_path / 'save.txt'
+    filename.write_text(contents)
+    store = engine.HighScoreStore(str(filename))
+    assert store.get(0) == [('ana', 7)] and store.get(1) == [] and store.get(3) == []
+    store.add(None, 5, 1)
+    assert store.get(1) == [('None', 5)] # cached like it was written
+    upgraded = filename.read_text()
+    assert upgraded.split('\n')[0] == engine.HIGHSCORE_HEADER
+    assert engine.parse_highscores(upgraded) == \
+           {0: [('ana', 7)], 1: [('None', 5)], 2: [('ben', 12)]}
+    assert engine.HighScoreStore(str(filename)).get(1) == [('None', 5)]
+
+def test_rack_index_grows_for_missed_bands(dictionary):
+    lexicon = engine.Lexicon(dictionary)
+    lexicon._rack_index = engine.RackIndex(lexicon, size=100, seed=1)
+    assert min(lexicon._rack_index.word_counts) > 6
+    chars, words = engine.generate_rack(5, 6, lexicon=lexicon)
+    assert 5 <= len(words) <= 6 and len(lexicon._rack_index) > 100
+    assert 1 in lexicon._rack_index.medians # racks of single words were measured
+    with pytest.raises(ValueError):
+        engine.generate_rack(10**6, lexicon=lexicon, max_racks=len(lexicon._rack_index))
+
+def test_rack_index_grows_in_background(dictionary, monkeypatch):
+    lexicon = engine.Lexicon(dictionary)
+    monkeypatch.setattr(engine, 'LEXICON', lexicon)
+    with pytest.raises(ValueError): # not built yet, and not built by the call
+        engine.generate_rack(wait=False)
+    assert lexicon._rack_index is None
+    lexicon._rack_index = engine.RackIndex(lexicon, size=100, seed=1)
+    with pytest.raises(ValueError):
+        engine.generate_rack(5, 6, wait=False)
+    assert len(lexicon._rack_index) == 100 # the miss is left to the background
+    queue = rounds.RoundQueue(modes=(), racks=True)
+    queue.start()
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                chars, words = engine.generate_rack(5, 6, wait=False)
+                break
+            except ValueError: # missed again, asks for more racks
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+    finally:
+        queue.stop()
+    assert 5 <= len(words) <= 6 and len(lexicon._rack_index) > 100
+
+def test_uncached_searches_skip_query_cache():
+    lexicon = engine.Lexicon(['aso', 'oas', 'sao', 'pusa'])
+    assert engine.possible_words('osa', lexicon, cache=False) == ['aso', 'oas', 'sao']
+    assert engine.best_words('osa', 2, lexicon, cache=False) == ['aso', 'oas']
+    assert len(lexicon.query_cache) == 0
+    engine.possible_words('osa', lexicon)
+    assert len(lexicon.query_cache) == 1
+
+def test_round_queue_builds_word_graph(monkeypatch):
+    lexicon = engine.Lexicon(['aso', 'oas', 'sao', 'pusa', 'upas'])
+    monkeypatch.setattr(engine, 'LEXICON', lexicon)
+    monkeypatch.setattr(engine, 'make_round',
+                        lambda mode: engine.Round(mode, 'aso', ('aso',), lexicon))
+    queue = rounds.RoundQueue(depth=1, modes=(2,), word_graph=True)
+    queue.start()
+    try:
+        assert queue.queues[2].get(timeout=10).lexicon is lexicon
+    finally:
+        queue.stop()
+    graph = lexicon._word_graph
+    assert graph is not None and graph.minimized
+    assert graph_words(graph) == {'aso', 'oas', 'sao', 'pusa', 'upas'}
+    assert graph_words(lexicon.updated(['sapu'], ['aso']).word_graph()) == \
+           {'oas', 'sao', 'pusa', 'upas', 'sapu'}
+
+def test_query_cache_evicts_least_recently_used():
+    cache = engine.QueryCache(maxsize=2)
+    cache.put('a', [1])
+    cache.put('b', [2])
+    assert cache.get('a') == [1] # b is now the least recently used
+    cache.put('c', [3])
+    assert cache.get('b') is None and cache.get('a') == [1] and cache.get('c') == [3]
+    cache.put('a', [4]) # stored again, not evicted
+    assert len(cache) == 2 and cache.get('a') == [4]
+    assert cache.stats == {'hits': 4, 'misses': 1, 'evictions': 1}
+    disabled = engine.QueryCache(maxsize=0)
+    disabled.put('a', [1])
+    assert disabled.get('a') is None and len(disabled) == 0
+    assert disabled.stats == {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def test_query_cache_counts_from_threads():
+    cache = engine.QueryCache(maxsize=64)
+    def query(thread):
+        for number in range(1000):
+            key = (thread, number % 32)
+            if cache.get(key) is None:
+                cache.put(key, [number])
+    threads = [threading.Thread(target=query, args=(thread,)) for thread in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats == {'hits': 2*(1000 - 32), 'misses': 2*32, 'evictions': 0}
+    assert len(cache) == 64